@@ -7,18 +7,23 @@
 3. 性能对比分析
 """
 
+import sys
 import time
 import asyncio
-from typing import Dict, Any, List, Callable
+from functools import partial
+from typing import Dict, Any, List, Callable, Deque, Optional
 from dataclasses import dataclass, field
 from contextlib import contextmanager
+from collections import OrderedDict, deque
+
+import numpy as np
 
 from src.common.logger import get_logger
 
 logger = get_logger("perception_benchmark")
 
 
-@dataclass
+@dataclass(slots=True)
 class BenchmarkResult:
     """基准测试结果"""
     name: str
@@ -45,22 +50,24 @@ class BenchmarkResult:
 class PerformanceTimer:
     """性能计时器"""
 
+    # 单个计时器保留的最大样本数
+    MAX_SAMPLES = 10_000
+
     def __init__(self):
-        self.timings: List[float] = []
+        self.timings: Deque[int] = deque(maxlen=self.MAX_SAMPLES)  # 纳秒
         self.start_time: float = 0.0
 
     @contextmanager
     def measure(self):
         """测量代码块执行时间"""
-        start = time.perf_counter()
+        start = time.perf_counter_ns()
         try:
             yield
         finally:
-            elapsed = time.perf_counter() - start
-            self.timings.append(elapsed)
+            self.timings.append(time.perf_counter_ns() - start)
 
     def get_stats(self) -> Dict[str, float]:
-        """获取统计信息"""
+        """获取统计信息（单位：秒）"""
         if not self.timings:
             return {
                 "count": 0,
@@ -70,12 +77,13 @@ class PerformanceTimer:
                 "max": 0.0,
             }
 
+        arr = np.fromiter(self.timings, dtype=np.int64, count=len(self.timings))
         return {
-            "count": len(self.timings),
-            "total": sum(self.timings),
-            "avg": sum(self.timings) / len(self.timings),
-            "min": min(self.timings),
-            "max": max(self.timings),
+            "count": int(arr.size),
+            "total": float(arr.sum()) / 1e9,
+            "avg": float(arr.mean()) / 1e9,
+            "min": float(arr.min()) / 1e9,
+            "max": float(arr.max()) / 1e9,
         }
 
     def reset(self):
@@ -89,12 +97,58 @@ class PerceptionBenchmark:
     def __init__(self):
         self.results: List[BenchmarkResult] = []
 
+    async def _calibrate_warmup(
+        self,
+        func: Callable,
+        is_async: bool,
+        kwargs: Dict[str, Any],
+        max_iters: int = 1024,
+        stability: float = 0.05,
+    ) -> int:
+        """
+        几何倍增预热（1、2、4、8…次一批），直到相邻两批的平均耗时相差不超过 stability
+
+        Args:
+            func: 要预热的函数
+            is_async: 是否为协程函数
+            kwargs: 传递给函数的参数
+            max_iters: 最大预热次数
+            stability: 判定稳定的相对误差
+
+        Returns:
+            实际预热次数
+        """
+        bound = partial(func, **kwargs)
+        total = 0
+        batch = 1
+        prev_mean = None
+
+        while total < max_iters:
+            batch = min(batch, max_iters - total)
+            start = time.perf_counter_ns()
+            if is_async:
+                for _ in range(batch):
+                    await bound()
+            else:
+                for _ in range(batch):
+                    bound()
+            mean = (time.perf_counter_ns() - start) / batch
+            total += batch
+
+            if prev_mean and abs(mean - prev_mean) / prev_mean < stability:
+                break
+
+            prev_mean = mean
+            batch *= 2
+
+        return total
+
     async def benchmark_function(
         self,
         name: str,
         func: Callable,
         iterations: int = 100,
-        warmup: int = 10,
+        warmup: Optional[int] = None,
         **kwargs
     ) -> BenchmarkResult:
         """
@@ -104,7 +158,7 @@ class PerceptionBenchmark:
             name: 测试名称
             func: 要测试的函数（可以是同步或异步）
             iterations: 迭代次数
-            warmup: 预热次数
+            warmup: 预热次数，None 时自动校准（几何倍增直到耗时稳定）
             **kwargs: 传递给函数的参数
 
         Returns:
@@ -112,38 +166,45 @@ class PerceptionBenchmark:
         """
         logger.info(f"开始基准测试: {name} (迭代{iterations}次)")
 
-        # 判断是否为协程函数
+        # 判断是否为协程函数，并预先绑定参数，循环体内只剩一次调用
         is_async = asyncio.iscoroutinefunction(func)
+        bound = partial(func, **kwargs)
+        perf_counter_ns = time.perf_counter_ns
 
         # 预热
-        for _ in range(warmup):
-            if is_async:
-                await func(**kwargs)
-            else:
-                func(**kwargs)
-
-        # 正式测试
-        timings = []
-        start_time = time.perf_counter()
-
-        for i in range(iterations):
-            iteration_start = time.perf_counter()
-
-            if is_async:
-                await func(**kwargs)
-            else:
-                func(**kwargs)
-
-            iteration_time = time.perf_counter() - iteration_start
-            timings.append(iteration_time)
-
-        total_time = time.perf_counter() - start_time
-
-        # 计算统计信息
-        avg_time = sum(timings) / len(timings)
-        min_time = min(timings)
-        max_time = max(timings)
-        ops_per_sec = iterations / total_time
+        if warmup is None:
+            warmup = await self._calibrate_warmup(func, is_async, kwargs)
+            logger.debug(f"{name} 预热校准完成，共预热 {warmup} 次")
+        elif is_async:
+            for _ in range(warmup):
+                await bound()
+        else:
+            for _ in range(warmup):
+                bound()
+
+        # 正式测试（纳秒整数计时，预分配结果数组）
+        timings = np.empty(iterations, dtype=np.int64)
+        start_ns = perf_counter_ns()
+
+        if is_async:
+            for i in range(iterations):
+                t0 = perf_counter_ns()
+                await bound()
+                timings[i] = perf_counter_ns() - t0
+        else:
+            for i in range(iterations):
+                t0 = perf_counter_ns()
+                bound()
+                timings[i] = perf_counter_ns() - t0
+
+        total_ns = perf_counter_ns() - start_ns
+
+        # 计算统计信息（报告时换算为秒）
+        total_time = total_ns / 1e9
+        avg_time = float(timings.mean()) / 1e9
+        min_time = float(timings.min()) / 1e9
+        max_time = float(timings.max()) / 1e9
+        ops_per_sec = iterations * 1e9 / total_ns
 
         result = BenchmarkResult(
             name=name,
@@ -153,6 +214,7 @@ class PerceptionBenchmark:
             min_time=min_time,
             max_time=max_time,
             ops_per_sec=ops_per_sec,
+            metadata={"warmup": warmup},
         )
 
         self.results.append(result)
@@ -348,16 +410,21 @@ class PerceptionBenchmark:
 class PerformanceMonitor:
     """性能监控器（装饰器模式）"""
 
-    _timers: Dict[str, PerformanceTimer] = {}
+    _timers: "OrderedDict[str, PerformanceTimer]" = OrderedDict()
+    _max_timers: int = 2048  # 计时器数量上限，超出时淘汰最久未使用的（LRU）
 
     @classmethod
     @contextmanager
     def measure(cls, name: str):
         """测量代码块性能"""
-        if name not in cls._timers:
-            cls._timers[name] = PerformanceTimer()
+        timer = cls._timers.get(name)
+        if timer is None:
+            timer = cls._timers[sys.intern(name)] = PerformanceTimer()
+            if len(cls._timers) > cls._max_timers:
+                cls._timers.popitem(last=False)
+        else:
+            cls._timers.move_to_end(name)
 
-        timer = cls._timers[name]
         with timer.measure():
             yield
 
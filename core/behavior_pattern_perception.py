@@ -3,17 +3,232 @@
 分析用户的在线习惯、作息规律、消息节奏等行为模式
 """
 
+import heapq
+import json
+import os
+import re
+import threading
 import time
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Any, List
-from dataclasses import dataclass, asdict
-from collections import defaultdict, Counter
+from typing import Dict, Optional, Any, Iterator, List
+from dataclasses import dataclass, field, replace
+from collections import defaultdict, OrderedDict
+from itertools import islice
+from operator import itemgetter
+
+import numpy as np
+
 from src.common.logger import get_logger
 
+from .numba_compat import HAS_NUMBA, njit
+
 logger = get_logger("behavior_pattern_perception")
 
+# 作息时段的小时索引（模块加载时预计算一次）
+_MORNING_IDX = np.array([6, 7, 8, 9, 10], dtype=np.int8)  # 早晨
+_AFTERNOON_IDX = np.array([11, 12, 13, 14, 15, 16, 17], dtype=np.int8)  # 下午
+_EVENING_IDX = np.array([18, 19, 20, 21, 22], dtype=np.int8)  # 晚上
+_NIGHT_IDX = np.array([23, 0, 1, 2, 3, 4, 5], dtype=np.int8)  # 深夜
+_PERIOD_NAMES = ("morning", "afternoon", "evening", "night")
+
+
+# 话题提取：中文词（2-4字）、英文单词（3字母以上）
+# 原停用词表（的/了/是/在/我/你/…）全为单字，而词元至少2个汉字或3个字母，
+# 按整词比较永远不会命中，因此匹配结果无需再逐词过滤
+_CHINESE_WORD_RE = re.compile(r'[\u4e00-\u9fa5]{2,4}')
+_ENGLISH_WORD_RE = re.compile(r'[a-zA-Z]{3,}')
+
+# 列存储数值缓冲区的初始容量
+_INITIAL_CAPACITY = 64
+
+
+def _fixed_tz_offset(since: float) -> Optional[int]:
+    """
+    检查本地时区自 since 起是否为固定偏移（逐日抽样 UTC 偏移）
+
+    Returns:
+        固定偏移秒数；时区存在夏令时或期间偏移有变化时返回 None
+    """
+    if time.daylight:
+        return None
+
+    offset = -time.timezone
+    for t in range(int(since), int(time.time()) + 86400, 86400):
+        if time.localtime(t).tm_gmtoff != offset:
+            return None
+    return offset
+
+
+# 整数运算快路径：仅对近一段时间内、且本地时区为固定偏移时生效，其余走 datetime 慢路径
+_TZ_FAST_SINCE = time.time() - 400 * 86400
+_TZ_OFFSET = _fixed_tz_offset(_TZ_FAST_SINCE)
+
+
+def _hour_weekday(timestamp: float) -> tuple[int, int]:
+    """
+    计算时间戳对应的本地小时与星期（周一为0）
+
+    快路径直接用整数运算（1970-01-01 为周四，即 weekday 3），
+    否则回退到 datetime.fromtimestamp。
+    """
+    if _TZ_OFFSET is None or timestamp < _TZ_FAST_SINCE:
+        dt = datetime.fromtimestamp(timestamp)
+        return dt.hour, dt.weekday()
+
+    days, seconds = divmod(int(timestamp // 1) + _TZ_OFFSET, 86400)
+    return seconds // 3600, (days + 3) % 7
+
+
+if HAS_NUMBA:
+
+    @njit(cache=True, fastmath=True)
+    def _numeric_stats(timestamps, hours, weekdays):
+        """
+        单次遍历数值列：累积小时/星期直方图，并用 Welford 算法计算消息间隔方差
+
+        Returns:
+            (hourly_counts[24], weekly_counts[7], interval_variance)
+        """
+        hourly_counts = np.zeros(24, dtype=np.int64)
+        weekly_counts = np.zeros(7, dtype=np.int64)
+        mean = 0.0
+        m2 = 0.0
+
+        n = timestamps.size
+        for i in range(n):
+            hourly_counts[hours[i]] += 1
+            weekly_counts[weekdays[i]] += 1
+            if i > 0:
+                interval = timestamps[i] - timestamps[i - 1]
+                delta = interval - mean
+                mean += delta / i
+                m2 += delta * (interval - mean)
+
+        variance = m2 / (n - 1) if n > 1 else 0.0
+        return hourly_counts, weekly_counts, variance
+
+else:
+
+    def _numeric_stats(timestamps: np.ndarray, hours: np.ndarray, weekdays: np.ndarray):
+        """
+        统计数值列：小时/星期直方图与消息间隔方差
+
+        Returns:
+            (hourly_counts[24], weekly_counts[7], interval_variance)
+        """
+        hourly_counts = np.bincount(hours, minlength=24)
+        weekly_counts = np.bincount(weekdays, minlength=7)
+        variance = float(np.diff(timestamps).var()) if timestamps.size > 1 else 0.0
+        return hourly_counts, weekly_counts, variance
+
+
+def _counts_to_dict(counts: np.ndarray, values: np.ndarray) -> Dict[int, int]:
+    """
+    将稠密直方图转换为只包含非零项的字典（对外接口格式）
+
+    键按在 values 中首次出现的顺序排列，与逐条累加得到的字典一致；
+    计数相同时活跃时段的先后取决于该顺序。
+    """
+    present, first_index = np.unique(values, return_index=True)
+    return {int(value): int(counts[value]) for value in present[np.argsort(first_index, kind="stable")]}
+
 
 @dataclass
+class UserMessageColumns:
+    """
+    单个用户的消息列式存储（SoA）
+
+    数值列保存在按倍数扩容的 numpy 缓冲区中，有效区间为 [head, head + size)；
+    消息按时间顺序到达，因此 timestamps 列始终有序。过期消息只前移 head，
+    死区不小于有效区时才整体压缩，使丢弃操作均摊 O(1)。
+    """
+
+    size: int = 0
+    _head: int = field(default=0, repr=False)
+    _chat_ids: List[str] = field(default_factory=list, repr=False)
+    _contents: List[str] = field(default_factory=list, repr=False)
+    _timestamps: np.ndarray = field(
+        default_factory=lambda: np.empty(_INITIAL_CAPACITY, dtype=np.float64), repr=False
+    )
+    _hours: np.ndarray = field(default_factory=lambda: np.empty(_INITIAL_CAPACITY, dtype=np.int8), repr=False)
+    _weekdays: np.ndarray = field(default_factory=lambda: np.empty(_INITIAL_CAPACITY, dtype=np.int8), repr=False)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """有效的时间戳列（视图）"""
+        return self._timestamps[self._head : self._head + self.size]
+
+    @property
+    def hours(self) -> np.ndarray:
+        """有效的小时列（视图）"""
+        return self._hours[self._head : self._head + self.size]
+
+    @property
+    def weekdays(self) -> np.ndarray:
+        """有效的星期列（视图）"""
+        return self._weekdays[self._head : self._head + self.size]
+
+    def iter_texts(self) -> Iterator[tuple[str, str]]:
+        """按时间顺序迭代有效消息的 (content, chat_id)"""
+        return zip(islice(self._contents, self._head, None), islice(self._chat_ids, self._head, None))
+
+    def append(self, timestamp: float, hour: int, weekday: int, content: str, chat_id: str):
+        """追加一条消息（均摊 O(1)）"""
+        end = self._head + self.size
+        if end == len(self._timestamps):
+            self._compact(grow=self._head < self.size)
+            end = self.size
+
+        self._timestamps[end] = timestamp
+        self._hours[end] = hour
+        self._weekdays[end] = weekday
+        self._contents.append(content)
+        self._chat_ids.append(chat_id)
+        self.size += 1
+
+    def drop_before(self, cutoff_time: float) -> int:
+        """
+        丢弃早于 cutoff_time 的消息（前移 head，必要时压缩）
+
+        Returns:
+            丢弃的消息数
+        """
+        idx = int(np.searchsorted(self.timestamps, cutoff_time, side="left"))
+        if idx == 0:
+            return 0
+
+        self._head += idx
+        self.size -= idx
+        if self._head >= self.size:
+            self._compact(grow=False)
+        return idx
+
+    def _compact(self, grow: bool):
+        """把有效区间移到缓冲区开头，grow 为真时同时将容量翻倍"""
+        head, end = self._head, self._head + self.size
+        capacity = len(self._timestamps) * 2 if grow else len(self._timestamps)
+        self._timestamps = self._moved(self._timestamps, head, end, capacity)
+        self._hours = self._moved(self._hours, head, end, capacity)
+        self._weekdays = self._moved(self._weekdays, head, end, capacity)
+        if head:
+            del self._contents[:head]
+            del self._chat_ids[:head]
+        self._head = 0
+
+    @staticmethod
+    def _moved(column: np.ndarray, head: int, end: int, capacity: int) -> np.ndarray:
+        if capacity == len(column):
+            column[: end - head] = column[head:end]
+            return column
+        new_column = np.empty(capacity, dtype=column.dtype)
+        new_column[: end - head] = column[head:end]
+        return new_column
+
+
+@dataclass(slots=True)
 class BehaviorPattern:
     """用户行为模式数据类"""
 
@@ -21,9 +236,9 @@ class BehaviorPattern:
     user_nickname: str = ""
 
     # 在线时间模式（24小时，每小时的活跃度）
-    hourly_activity: Dict[int, int] = None  # {0-23: message_count}
-    most_active_hours: List[int] = None  # 最活跃的时段
-    least_active_hours: List[int] = None  # 最不活跃的时段
+    hourly_activity: Dict[int, int] = field(default_factory=dict)  # {0-23: message_count}
+    most_active_hours: List[int] = field(default_factory=list)  # 最活跃的时段
+    least_active_hours: List[int] = field(default_factory=list)  # 最不活跃的时段
 
     # 作息类型
     chronotype: str = "unknown"  # "early_bird" | "night_owl" | "regular" | "unknown"
@@ -35,39 +250,45 @@ class BehaviorPattern:
     message_burst_tendency: float = 0.0  # 爆发式发言倾向 0.0-1.0
 
     # 话题偏好（最常讨论的话题）
-    favorite_topics: List[str] = None
+    favorite_topics: List[str] = field(default_factory=list)
     topic_diversity: float = 0.0  # 话题多样性 0.0-1.0
 
     # 周期性行为
-    weekly_pattern: Dict[int, int] = None  # {0-6: message_count} 周一到周日
+    weekly_pattern: Dict[int, int] = field(default_factory=dict)  # {0-6: message_count} 周一到周日
     has_weekend_pattern: bool = False  # 是否有明显的周末模式
     weekend_activity_ratio: float = 1.0  # 周末/工作日活跃度比
 
     # 互动偏好
-    preferred_interaction_users: List[str] = None  # 最常互动的用户
+    preferred_interaction_users: List[str] = field(default_factory=list)  # 最常互动的用户
     group_participation_rate: float = 0.0  # 群聊参与率
 
     # 时间戳
     timestamp: float = 0.0
     data_points: int = 0  # 数据点数量（消息数）
 
-    def __post_init__(self):
-        if self.hourly_activity is None:
-            self.hourly_activity = {}
-        if self.most_active_hours is None:
-            self.most_active_hours = []
-        if self.least_active_hours is None:
-            self.least_active_hours = []
-        if self.favorite_topics is None:
-            self.favorite_topics = []
-        if self.weekly_pattern is None:
-            self.weekly_pattern = {}
-        if self.preferred_interaction_users is None:
-            self.preferred_interaction_users = []
-
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return asdict(self)
+        """转换为字典（浅拷贝，列表/字典字段直接引用，调用方不应修改）"""
+        return {
+            "user_id": self.user_id,
+            "user_nickname": self.user_nickname,
+            "hourly_activity": self.hourly_activity,
+            "most_active_hours": self.most_active_hours,
+            "least_active_hours": self.least_active_hours,
+            "chronotype": self.chronotype,
+            "peak_activity_time": self.peak_activity_time,
+            "avg_messages_per_day": self.avg_messages_per_day,
+            "avg_messages_per_hour_when_active": self.avg_messages_per_hour_when_active,
+            "message_burst_tendency": self.message_burst_tendency,
+            "favorite_topics": self.favorite_topics,
+            "topic_diversity": self.topic_diversity,
+            "weekly_pattern": self.weekly_pattern,
+            "has_weekend_pattern": self.has_weekend_pattern,
+            "weekend_activity_ratio": self.weekend_activity_ratio,
+            "preferred_interaction_users": self.preferred_interaction_users,
+            "group_participation_rate": self.group_participation_rate,
+            "timestamp": self.timestamp,
+            "data_points": self.data_points,
+        }
 
     def get_human_readable_summary(self) -> str:
         """获取人类可读的行为模式摘要"""
@@ -99,22 +320,132 @@ class BehaviorPattern:
         return "，".join(parts)
 
 
+def _copy_pattern(pattern: BehaviorPattern, user_nickname: str) -> BehaviorPattern:
+    """复制缓存中的行为模式（列表/字典字段另建副本，调用方修改不会影响缓存）"""
+    return replace(
+        pattern,
+        user_nickname=user_nickname,
+        hourly_activity=dict(pattern.hourly_activity),
+        most_active_hours=list(pattern.most_active_hours),
+        least_active_hours=list(pattern.least_active_hours),
+        favorite_topics=list(pattern.favorite_topics),
+        weekly_pattern=dict(pattern.weekly_pattern),
+        preferred_interaction_users=list(pattern.preferred_interaction_users),
+    )
+
+
 class BehaviorPatternPerception:
     """行为模式感知器"""
 
-    def __init__(self, history_days: int = 30):
+    def __init__(self, history_days: int = 30, cache_file: str = ""):
         """
         初始化行为模式感知器
 
         Args:
             history_days: 历史分析天数
+            cache_file: 行为模式缓存持久化文件路径，留空则不持久化
         """
         self.history_days = history_days
-        self.user_messages: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
-        # 每条消息记录: {"timestamp": float, "hour": int, "weekday": int, "content": str, "chat_id": str}
+        self.user_messages: Dict[str, UserMessageColumns] = defaultdict(UserMessageColumns)
+
+        # 过期清理按批次均摊执行，避免每次追加都压缩整个历史
+        self._appends_since_cleanup: Dict[str, int] = defaultdict(int)
+        self._cleanup_interval = 256
+
+        # 行为模式缓存（LRU）：user_id -> (data_points, last_timestamp, pattern)
+        self._pattern_cache: OrderedDict[str, tuple[int, float, BehaviorPattern]] = OrderedDict()
+        self._pattern_cache_max_size = 1024
+
+        # 缓存持久化：重启后用户还没有新消息时沿用上次的分析结果；
+        # 新消息的数据点数追上恢复结果之前，保存时仍写回恢复结果，避免覆盖完整历史的分析
+        self.cache_file = cache_file
+        self._restored_patterns: Dict[str, BehaviorPattern] = {}
+        # 保护 _pattern_cache / _restored_patterns：后台保存线程需要在一致的快照上序列化
+        self._cache_lock = threading.Lock()
+        self._cache_save_interval = 300.0  # 每5分钟保存一次
+        self._cache_saver_thread = None
+        self._stop_cache_saver = threading.Event()
+
+        if cache_file:
+            self._load_cache(cache_file)
+            self._start_cache_saver()
 
         logger.info(f"行为模式感知模块初始化完成，历史分析天数: {history_days}")
 
+    def _start_cache_saver(self):
+        """启动后台缓存保存线程"""
+        if self._cache_saver_thread and self._cache_saver_thread.is_alive():
+            return
+
+        self._stop_cache_saver.clear()
+        self._cache_saver_thread = threading.Thread(
+            target=self._cache_saver_loop,
+            name="BehaviorPattern-Cache-Saver",
+            daemon=True
+        )
+        self._cache_saver_thread.start()
+
+    def _cache_saver_loop(self):
+        """缓存保存循环（后台线程）"""
+        while not self._stop_cache_saver.wait(self._cache_save_interval):
+            self._save_cache(self.cache_file)
+
+    def stop_cache_saver(self):
+        """停止后台缓存保存并立即保存一次"""
+        self._stop_cache_saver.set()
+        if self._cache_saver_thread:
+            self._cache_saver_thread.join(timeout=3)
+        if self.cache_file:
+            self._save_cache(self.cache_file)
+
+    def _save_cache(self, path: str):
+        """将行为模式缓存写入文件（JSON，先写临时文件再替换，保证原子性）"""
+        try:
+            # 在锁内复制快照，避免与主线程的修改冲突
+            with self._cache_lock:
+                restored = dict(self._restored_patterns)
+                cached = [(user_id, entry[2]) for user_id, entry in self._pattern_cache.items()]
+
+            cutoff_time = time.time() - (self.history_days * 86400)
+            entries = {
+                user_id: pattern.to_dict() for user_id, pattern in restored.items() if pattern.timestamp >= cutoff_time
+            }
+            for user_id, pattern in cached:
+                # 只凭少量新消息算出的结果不覆盖数据更完整的恢复结果
+                previous = restored.get(user_id)
+                if previous is None or pattern.data_points >= previous.data_points:
+                    entries[user_id] = pattern.to_dict()
+
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            logger.debug(f"行为模式缓存已保存: {len(entries)} 个用户")
+        except Exception as e:
+            logger.error(f"保存行为模式缓存失败: {e}")
+
+    def _load_cache(self, path: str):
+        """读取缓存文件，恢复仍在历史分析窗口内的行为模式"""
+        try:
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                return
+
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+
+            cutoff_time = time.time() - (self.history_days * 86400)
+            for user_id, data in entries.items():
+                # JSON 对象的键只能是字符串，还原小时/星期的整数键
+                data["hourly_activity"] = {int(k): v for k, v in data["hourly_activity"].items()}
+                data["weekly_pattern"] = {int(k): v for k, v in data["weekly_pattern"].items()}
+                pattern = BehaviorPattern(**data)
+                if pattern.timestamp >= cutoff_time:
+                    self._restored_patterns[user_id] = pattern
+
+            logger.info(f"已恢复 {len(self._restored_patterns)} 个用户的行为模式缓存")
+        except Exception as e:
+            logger.error(f"加载行为模式缓存失败: {e}")
+
     def record_message(
         self,
         user_id: str,
@@ -134,20 +465,20 @@ class BehaviorPatternPerception:
         if timestamp is None:
             timestamp = time.time()
 
-        dt = datetime.fromtimestamp(timestamp)
+        hour, weekday = _hour_weekday(timestamp)
 
-        message_record = {
-            "timestamp": timestamp,
-            "hour": dt.hour,
-            "weekday": dt.weekday(),
-            "content": message_content,
-            "chat_id": chat_id,
-        }
-
-        self.user_messages[user_id].append(message_record)
+        cols = self.user_messages[user_id]
+        cols.append(timestamp, hour, weekday, message_content, chat_id)
+        with self._cache_lock:
+            self._pattern_cache.pop(user_id, None)
 
-        # 清理过期数据
-        self._cleanup_old_messages(user_id)
+        # 清理过期数据：队首确实过期，且累计追加达到阈值或队首已过期超过一天时才执行
+        appends = self._appends_since_cleanup[user_id] + 1
+        self._appends_since_cleanup[user_id] = appends
+        cutoff_time = time.time() - (self.history_days * 86400)
+        oldest = cols.timestamps[0]
+        if oldest < cutoff_time and (appends >= self._cleanup_interval or oldest < cutoff_time - 86400):
+            self._cleanup_old_messages(user_id)
 
     def _cleanup_old_messages(self, user_id: str):
         """清理过期消息"""
@@ -155,55 +486,68 @@ class BehaviorPatternPerception:
             return
 
         cutoff_time = time.time() - (self.history_days * 86400)
-        self.user_messages[user_id] = [
-            msg for msg in self.user_messages[user_id]
-            if msg["timestamp"] >= cutoff_time
-        ]
-
-    def _analyze_hourly_activity(self, messages: List[Dict]) -> Dict[int, int]:
-        """分析每小时活跃度"""
-        hourly_count = defaultdict(int)
-        for msg in messages:
-            hourly_count[msg["hour"]] += 1
-        return dict(hourly_count)
-
-    def _analyze_chronotype(self, hourly_activity: Dict[int, int]) -> tuple[str, str]:
+        self.user_messages[user_id].drop_before(cutoff_time)
+        self._appends_since_cleanup[user_id] = 0
+
+    def _analyze_all(
+        self, cols: UserMessageColumns
+    ) -> tuple[np.ndarray, np.ndarray, float, Dict[str, int], int, Dict[str, int]]:
         """
-        分析作息类型
+        单次遍历用户消息，累积所有分析所需的统计量
+
+        数值列交给 _numeric_stats 一次处理，文本列（话题、聊天）在同一个循环中统计。
 
         Returns:
-            (chronotype, peak_activity_time)
+            (hourly_counts, weekly_counts, interval_variance, word_freq, total_words, chat_counts)
         """
-        if not hourly_activity:
-            return "unknown", ""
+        hourly_counts, weekly_counts, interval_variance = _numeric_stats(cols.timestamps, cols.hours, cols.weekdays)
 
-        # 计算不同时段的活跃度
-        morning_hours = [6, 7, 8, 9, 10]  # 早晨
-        afternoon_hours = [11, 12, 13, 14, 15, 16, 17]  # 下午
-        evening_hours = [18, 19, 20, 21, 22]  # 晚上
-        night_hours = [23, 0, 1, 2, 3, 4, 5]  # 深夜
+        word_freq: Dict[str, int] = {}
+        chat_counts: Dict[str, int] = {}
+        total_words = 0
+        for content, chat_id in cols.iter_texts():
+            if chat_id:
+                chat_counts[chat_id] = chat_counts.get(chat_id, 0) + 1
 
-        morning_activity = sum(hourly_activity.get(h, 0) for h in morning_hours)
-        afternoon_activity = sum(hourly_activity.get(h, 0) for h in afternoon_hours)
-        evening_activity = sum(hourly_activity.get(h, 0) for h in evening_hours)
-        night_activity = sum(hourly_activity.get(h, 0) for h in night_hours)
+            # 提取中文词（2-4字）和英文单词
+            for word in _CHINESE_WORD_RE.findall(content):
+                word_freq[word] = word_freq.get(word, 0) + 1
+                total_words += 1
+            for match in _ENGLISH_WORD_RE.finditer(content):
+                word = match.group().lower()
+                word_freq[word] = word_freq.get(word, 0) + 1
+                total_words += 1
 
-        # 找出最活跃时段
-        activities = {
-            "morning": morning_activity,
-            "afternoon": afternoon_activity,
-            "evening": evening_activity,
-            "night": night_activity,
-        }
-        peak_time = max(activities, key=activities.get)
+        return hourly_counts, weekly_counts, float(interval_variance), word_freq, total_words, chat_counts
+
+    def _analyze_chronotype(self, hourly_counts: np.ndarray) -> tuple[str, str]:
+        """
+        分析作息类型
+
+        Args:
+            hourly_counts: 长度为24的每小时消息计数
+
+        Returns:
+            (chronotype, peak_activity_time)
+        """
+        # 计算不同时段的活跃度
+        activities = np.array([
+            hourly_counts[_MORNING_IDX].sum(),
+            hourly_counts[_AFTERNOON_IDX].sum(),
+            hourly_counts[_EVENING_IDX].sum(),
+            hourly_counts[_NIGHT_IDX].sum(),
+        ])
 
         # 判断作息类型
-        total_activity = sum(activities.values())
+        total_activity = int(activities.sum())
         if total_activity == 0:
             return "unknown", ""
 
-        morning_ratio = morning_activity / total_activity
-        night_ratio = night_activity / total_activity
+        # 找出最活跃时段
+        peak_time = _PERIOD_NAMES[int(np.argmax(activities))]
+
+        morning_ratio = activities[0] / total_activity
+        night_ratio = activities[3] / total_activity
 
         if morning_ratio > 0.35:
             chronotype = "early_bird"
@@ -227,91 +571,74 @@ class BehaviorPatternPerception:
         sorted_hours = sorted(hourly_activity.items(), key=lambda x: x[1])
         return [hour for hour, count in sorted_hours[:bottom_n]]
 
-    def _analyze_message_rhythm(self, messages: List[Dict]) -> tuple[float, float, float]:
+    def _analyze_message_rhythm(
+        self, cols: UserMessageColumns, hourly_counts: np.ndarray, interval_variance: float
+    ) -> tuple[float, float, float]:
         """
         分析消息节奏
 
+        Args:
+            cols: 用户消息列存储
+            hourly_counts: 长度为24的每小时消息计数
+            interval_variance: 消息时间间隔的方差
+
         Returns:
             (avg_per_day, avg_per_hour_when_active, burst_tendency)
         """
-        if not messages:
+        if not cols:
             return 0.0, 0.0, 0.0
 
+        timestamps = cols.timestamps
+
         # 日均消息数
-        time_span_days = (messages[-1]["timestamp"] - messages[0]["timestamp"]) / 86400
-        avg_per_day = len(messages) / max(1, time_span_days)
+        time_span_days = float(timestamps[-1] - timestamps[0]) / 86400
+        avg_per_day = len(cols) / max(1, time_span_days)
 
         # 计算活跃时段的平均每小时消息数
-        hourly_count = defaultdict(int)
-        for msg in messages:
-            hourly_count[msg["hour"]] += 1
-
-        active_hours = [count for count in hourly_count.values() if count > 0]
-        avg_per_hour_when_active = sum(active_hours) / len(active_hours) if active_hours else 0.0
-
-        # 爆发倾向：计算消息时间间隔的方差
-        if len(messages) > 1:
-            intervals = []
-            for i in range(1, len(messages)):
-                interval = messages[i]["timestamp"] - messages[i-1]["timestamp"]
-                intervals.append(interval)
-
-            avg_interval = sum(intervals) / len(intervals)
-            variance = sum((x - avg_interval) ** 2 for x in intervals) / len(intervals)
-            # 归一化到0-1
-            burst_tendency = min(1.0, variance / (3600 * 3600))  # 以1小时为基准
-        else:
-            burst_tendency = 0.0
+        active_hours = int(np.count_nonzero(hourly_counts))
+        avg_per_hour_when_active = int(hourly_counts.sum()) / active_hours if active_hours else 0.0
+
+        # 爆发倾向：消息时间间隔的方差，归一化到0-1
+        burst_tendency = min(1.0, interval_variance / (3600 * 3600))  # 以1小时为基准
 
         return avg_per_day, avg_per_hour_when_active, burst_tendency
 
-    def _extract_favorite_topics(self, messages: List[Dict], top_n: int = 5) -> tuple[List[str], float]:
+    def _extract_favorite_topics(
+        self, word_freq: Dict[str, int], total_words: int, top_n: int = 5
+    ) -> tuple[List[str], float]:
         """
-        提取最喜欢的话题
+        提取最喜欢的话题（基于词频）
+
+        Args:
+            word_freq: 词频统计
+            total_words: 总词数
 
         Returns:
             (favorite_topics, topic_diversity)
         """
-        # 简单的关键词提取（基于词频）
-        from collections import Counter
-        import re
-
-        all_words = []
-        for msg in messages:
-            # 提取中文词（2-4字）和英文单词
-            chinese_words = re.findall(r'[\u4e00-\u9fa5]{2,4}', msg["content"])
-            english_words = re.findall(r'[a-zA-Z]{3,}', msg["content"].lower())
-            all_words.extend(chinese_words + english_words)
-
-        # 停用词过滤
-        stopwords = {"的", "了", "是", "在", "我", "你", "他", "她", "它", "们", "这", "那", "和", "与"}
-        all_words = [w for w in all_words if w not in stopwords]
-
-        if not all_words:
+        if not total_words:
             return [], 0.0
 
-        word_freq = Counter(all_words)
-        favorite_topics = [word for word, count in word_freq.most_common(top_n)]
+        favorite_topics = [word for word, count in heapq.nlargest(top_n, word_freq.items(), key=itemgetter(1))]
 
         # 话题多样性：使用词汇多样性指标（unique words / total words）
-        topic_diversity = len(set(all_words)) / len(all_words) if all_words else 0.0
+        topic_diversity = len(word_freq) / total_words
 
         return favorite_topics, topic_diversity
 
-    def _analyze_weekly_pattern(self, messages: List[Dict]) -> tuple[Dict[int, int], bool, float]:
+    def _analyze_weekly_pattern(self, weekly_counts: np.ndarray) -> tuple[bool, float]:
         """
         分析周模式
 
+        Args:
+            weekly_counts: 长度为7的每星期几消息计数
+
         Returns:
-            (weekly_pattern, has_weekend_pattern, weekend_ratio)
+            (has_weekend_pattern, weekend_ratio)
         """
-        weekly_count = defaultdict(int)
-        for msg in messages:
-            weekly_count[msg["weekday"]] += 1
-
         # 计算周末/工作日比例
-        weekday_activity = sum(weekly_count.get(i, 0) for i in range(5))  # 周一到周五
-        weekend_activity = sum(weekly_count.get(i, 0) for i in [5, 6])  # 周六周日
+        weekday_activity = int(weekly_counts[:5].sum())  # 周一到周五
+        weekend_activity = int(weekly_counts[5:].sum())  # 周六周日
 
         weekday_avg = weekday_activity / 5 if weekday_activity > 0 else 0
         weekend_avg = weekend_activity / 2 if weekend_activity > 0 else 0
@@ -321,12 +648,11 @@ class BehaviorPatternPerception:
         # 如果周末活跃度显著不同（>1.5倍或<0.5倍），认为有明显周末模式
         has_weekend_pattern = weekend_ratio > 1.5 or weekend_ratio < 0.5
 
-        return dict(weekly_count), has_weekend_pattern, weekend_ratio
+        return has_weekend_pattern, weekend_ratio
 
-    def _analyze_interaction_preference(self, messages: List[Dict]) -> List[str]:
+    def _analyze_interaction_preference(self, chat_counts: Dict[str, int]) -> List[str]:
         """分析互动偏好（最常在哪些聊天中发言）"""
-        chat_counts = Counter(msg["chat_id"] for msg in messages if msg["chat_id"])
-        return [chat_id for chat_id, count in chat_counts.most_common(5)]
+        return [chat_id for chat_id, count in heapq.nlargest(5, chat_counts.items(), key=itemgetter(1))]
 
     def get_behavior_pattern(self, user_id: str, user_nickname: str = "") -> BehaviorPattern:
         """
@@ -339,28 +665,58 @@ class BehaviorPatternPerception:
         Returns:
             BehaviorPattern对象
         """
-        messages = self.user_messages.get(user_id, [])
-
-        if not messages:
-            return BehaviorPattern(
-                user_id=user_id,
-                user_nickname=user_nickname,
-                timestamp=time.time(),
-                data_points=0,
-            )
-
-        # 分析各项指标
-        hourly_activity = self._analyze_hourly_activity(messages)
-        chronotype, peak_time = self._analyze_chronotype(hourly_activity)
+        # 清理是惰性的，分析前先剔除过期消息以保证结果准确
+        self._cleanup_old_messages(user_id)
+        cols = self.user_messages.get(user_id)
+
+        # 冷启动：重启后还没有新消息时沿用持久化的分析结果；有新消息时按新消息实时分析。
+        # 恢复结果超出历史窗口，或新消息的数据点数已追上它时丢弃
+        restored = self._restored_patterns.get(user_id)
+        if restored is not None:
+            cutoff_time = time.time() - (self.history_days * 86400)
+            if restored.timestamp < cutoff_time or len(cols or ()) >= restored.data_points:
+                with self._cache_lock:
+                    self._restored_patterns.pop(user_id, None)
+                restored = None
+
+        if not cols:
+            if restored is not None:
+                return _copy_pattern(restored, user_nickname)
+            return BehaviorPattern(user_id=user_id, user_nickname=user_nickname, timestamp=time.time())
+
+        # 消息未变化时直接复用缓存的分析结果
+        data_points = len(cols)
+        last_timestamp = float(cols.timestamps[-1])
+        cached = self._pattern_cache.get(user_id)
+        if cached is not None and cached[0] == data_points and cached[1] == last_timestamp:
+            with self._cache_lock:
+                self._pattern_cache.move_to_end(user_id)
+            return _copy_pattern(cached[2], user_nickname)
+
+        # 单次遍历累积统计量，再由各项分析派生结果
+        (
+            hourly_counts,
+            weekly_counts,
+            interval_variance,
+            word_freq,
+            total_words,
+            chat_counts,
+        ) = self._analyze_all(cols)
+
+        hourly_activity = _counts_to_dict(hourly_counts, cols.hours)
+        chronotype, peak_time = self._analyze_chronotype(hourly_counts)
         most_active_hours = self._get_most_active_hours(hourly_activity, 3)
         least_active_hours = self._get_least_active_hours(hourly_activity, 3)
 
-        avg_per_day, avg_per_hour, burst_tendency = self._analyze_message_rhythm(messages)
-        favorite_topics, topic_diversity = self._extract_favorite_topics(messages)
-        weekly_pattern, has_weekend, weekend_ratio = self._analyze_weekly_pattern(messages)
-        preferred_chats = self._analyze_interaction_preference(messages)
+        avg_per_day, avg_per_hour, burst_tendency = self._analyze_message_rhythm(
+            cols, hourly_counts, interval_variance
+        )
+        favorite_topics, topic_diversity = self._extract_favorite_topics(word_freq, total_words)
+        weekly_pattern = _counts_to_dict(weekly_counts, cols.weekdays)
+        has_weekend, weekend_ratio = self._analyze_weekly_pattern(weekly_counts)
+        preferred_chats = self._analyze_interaction_preference(chat_counts)
 
-        return BehaviorPattern(
+        pattern = BehaviorPattern(
             user_id=user_id,
             user_nickname=user_nickname,
             hourly_activity=hourly_activity,
@@ -378,5 +734,12 @@ class BehaviorPatternPerception:
             weekend_activity_ratio=weekend_ratio,
             preferred_interaction_users=preferred_chats,
             timestamp=time.time(),
-            data_points=len(messages),
+            data_points=data_points,
         )
+
+        with self._cache_lock:
+            self._pattern_cache[user_id] = (data_points, last_timestamp, pattern)
+            if len(self._pattern_cache) > self._pattern_cache_max_size:
+                self._pattern_cache.popitem(last=False)
+
+        return _copy_pattern(pattern, user_nickname)
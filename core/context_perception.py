@@ -3,16 +3,85 @@
 感知当前对话的话题、氛围、节奏等
 """
 
+import re
 import time
+from bisect import bisect_left
+from itertools import islice
 from typing import Dict, Optional, Any, List
-from dataclasses import dataclass, asdict
-from collections import deque
+from dataclasses import dataclass, field, replace
+from collections import Counter, deque
+
+import numpy as np
+
 from src.common.logger import get_logger
 
+from .numba_compat import HAS_NUMBA, njit
+
 logger = get_logger("context_perception")
 
+# 话题提取：中文词语（2-4个字）、英文单词（3字母以上）及停用词
+_CN_RE = re.compile(r'[\u4e00-\u9fa5]{2,4}')
+_EN_RE = re.compile(r'[a-zA-Z]{3,}')
+_STOPWORDS = frozenset({
+    "的", "了", "是", "在", "我", "你", "他", "她", "它", "们",
+    "这", "那", "和", "与", "及", "或", "吗", "吧", "啊", "呢",
+    "a", "an", "the", "is", "are", "was", "were", "in", "on", "at",
+})
+
+# 氛围描述
+_ATMOSPHERE_DESC = {
+    "lively": "气氛热烈",
+    "active": "气氛活跃",
+    "calm": "气氛平静",
+    "quiet": "气氛安静",
+    "silent": "无人说话",
+}
+_DEFAULT_ATMOSPHERE_DESC = "气氛正常"
+
+# 消息数达到该值时话题连贯性改用数组内核计算（更少时逐条计算反而更快；numba 内核的分界点更低）
+_VECTORIZE_MIN_MESSAGES = 16 if HAS_NUMBA else 96
+
+
+if HAS_NUMBA:
+
+    @njit(cache=True)
+    def _coherence_kernel(timestamps, lengths):
+        """
+        话题连贯性内核：单次循环累加相邻消息的时间连贯性与长度连贯性
+
+        Args:
+            timestamps: 消息时间戳（n 条）
+            lengths: 第 2..n 条消息的长度（n-1 条）
+
+        Returns:
+            平均连贯性 (0.0-1.0)
+        """
+        total = 0.0
+        for i in range(lengths.size):
+            time_coherence = max(0.0, 1.0 - (timestamps[i + 1] - timestamps[i]) / 300)
+            length_coherence = 1.0 if 10 <= lengths[i] <= 200 else 0.5
+            total += (time_coherence + length_coherence) / 2
+        return total / lengths.size
+
+else:
+
+    def _coherence_kernel(timestamps, lengths):
+        """话题连贯性内核（numpy 向量化回退实现）"""
+        time_coherence = np.maximum(0.0, 1.0 - np.diff(timestamps) / 300)
+        length_coherence = np.where((lengths >= 10) & (lengths <= 200), 1.0, 0.5)
+        return float(((time_coherence + length_coherence) / 2).mean())
+
+
+def _count_question_marks(content: str) -> int:
+    """
+    统计消息中的问号数量（半角和全角）
+
+    str.count 走 CPython 的快速子串查找，实测比 re.compile(r'[?？]') 逐字符匹配快得多。
+    """
+    return content.count("?") + content.count("？")
 
-@dataclass
+
+@dataclass(slots=True)
 class MessageRecord:
     """消息记录"""
 
@@ -20,9 +89,10 @@ class MessageRecord:
     content: str
     timestamp: float
     user_nickname: str = ""
+    qmark_count: int = 0  # 问号数量（记录时预先统计）
 
 
-@dataclass
+@dataclass(slots=True)
 class ContextStatus:
     """会话上下文状态数据类"""
 
@@ -44,7 +114,7 @@ class ContextStatus:
     last_message_time: float = 0.0
 
     # 话题相关
-    current_topics: List[str] = None  # 当前话题关键词
+    current_topics: List[str] = field(default_factory=list)  # 当前话题关键词
     topic_coherence: float = 0.5  # 话题连贯性 0.0-1.0
 
     # 互动模式
@@ -54,27 +124,32 @@ class ContextStatus:
     # 时间戳
     timestamp: float = 0.0
 
-    def __post_init__(self):
-        if self.current_topics is None:
-            self.current_topics = []
-
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return asdict(self)
+        """转换为字典（浅拷贝，列表字段直接引用，调用方不应修改）"""
+        return {
+            "chat_id": self.chat_id,
+            "message_count_5min": self.message_count_5min,
+            "message_count_1h": self.message_count_1h,
+            "active_user_count_5min": self.active_user_count_5min,
+            "active_user_count_1h": self.active_user_count_1h,
+            "atmosphere": self.atmosphere,
+            "atmosphere_score": self.atmosphere_score,
+            "conversation_pace": self.conversation_pace,
+            "avg_message_interval": self.avg_message_interval,
+            "last_message_time": self.last_message_time,
+            "current_topics": self.current_topics,
+            "topic_coherence": self.topic_coherence,
+            "interaction_pattern": self.interaction_pattern,
+            "question_count": self.question_count,
+            "timestamp": self.timestamp,
+        }
 
     def get_human_readable_summary(self) -> str:
         """获取人类可读的上下文摘要"""
         parts = []
 
         # 氛围描述
-        atmosphere_desc = {
-            "lively": "气氛热烈",
-            "active": "气氛活跃",
-            "calm": "气氛平静",
-            "quiet": "气氛安静",
-            "silent": "无人说话",
-        }
-        parts.append(atmosphere_desc.get(self.atmosphere, "气氛正常"))
+        parts.append(_ATMOSPHERE_DESC.get(self.atmosphere, _DEFAULT_ATMOSPHERE_DESC))
 
         # 参与人数
         if self.active_user_count_5min > 0:
@@ -94,7 +169,10 @@ class ContextPerception:
     def __init__(self):
         """初始化会话上下文感知器"""
         self.chat_messages: Dict[str, deque] = {}  # chat_id -> deque of MessageRecord
+        self.chat_timestamps: Dict[str, deque] = {}  # chat_id -> 与 chat_messages 同步的时间戳（有序）
+        self._user_last_seen: Dict[str, Dict[str, float]] = {}  # chat_id -> user_id -> 最后发言时间
         self.chat_cache: Dict[str, ContextStatus] = {}  # 上下文状态缓存
+        self.cache_ttl: float = 60.0  # 缓存有效期（秒）
 
         logger.info("会话上下文感知模块初始化完成")
 
@@ -119,43 +197,88 @@ class ContextPerception:
         if timestamp is None:
             timestamp = time.time()
 
-        message = MessageRecord(
-            user_id=user_id,
-            content=content,
-            timestamp=timestamp,
-            user_nickname=user_nickname,
-        )
-
         if chat_id not in self.chat_messages:
             self.chat_messages[chat_id] = deque(maxlen=500)  # 最多保存500条消息
+            self.chat_timestamps[chat_id] = deque(maxlen=500)
+            self._user_last_seen[chat_id] = {}
+
+        self.chat_messages[chat_id].append(
+            MessageRecord(
+                user_id=user_id,
+                content=content,
+                timestamp=timestamp,
+                user_nickname=user_nickname,
+                qmark_count=_count_question_marks(content),
+            )
+        )
+        self.chat_timestamps[chat_id].append(timestamp)
+        self._user_last_seen[chat_id][user_id] = timestamp
 
-        self.chat_messages[chat_id].append(message)
-
-        # 清理过期缓存
-        if chat_id in self.chat_cache:
-            cache_age = time.time() - self.chat_cache[chat_id].timestamp
-            if cache_age > 60:  # 缓存1分钟
-                del self.chat_cache[chat_id]
+        # 有新消息，该聊天的缓存状态失效
+        self.chat_cache.pop(chat_id, None)
 
-    def _get_messages_in_window(self, chat_id: str, time_window: float) -> List[MessageRecord]:
+    def _collect_windows(
+        self, chat_id: str, short_window: float, long_window: float, recent: int = 20
+    ) -> tuple[List[MessageRecord], List[MessageRecord], int, int, int]:
         """
-        获取时间窗口内的消息
+        同时统计长、短两个时间窗口的消息数和活跃用户数，只复制需要分析的消息
+
+        消息数由时间戳二分得到，活跃用户数由增量维护的“用户最后发言时间”得到，
+        因此只需从队尾复制短窗口消息和长窗口内最近 recent 条消息。
 
         Args:
             chat_id: 聊天ID
-            time_window: 时间窗口（秒）
+            short_window: 短时间窗口（秒）
+            long_window: 长时间窗口（秒），须不小于 short_window
+            recent: 长窗口内需要返回的最近消息条数
 
         Returns:
-            消息列表
+            (短窗口消息, 长窗口最近 recent 条消息, 长窗口消息数, 短窗口活跃用户数, 长窗口活跃用户数)
         """
         if chat_id not in self.chat_messages:
-            return []
+            return [], [], 0, 0, 0
 
         current_time = time.time()
-        cutoff_time = current_time - time_window
+        short_cutoff = current_time - short_window
+        long_cutoff = current_time - long_window
 
+        # 消息按时间顺序到达，二分查找两个窗口的起点
+        timestamps = self.chat_timestamps[chat_id]
+        long_start = bisect_left(timestamps, long_cutoff)
+        short_start = bisect_left(timestamps, short_cutoff, long_start)
+
+        count_long = len(timestamps) - long_start
+        if count_long == 0:
+            return [], [], 0, 0, 0
+
+        # 从队尾复制短窗口消息与长窗口最近 recent 条消息中较多的那部分
+        count_short = len(timestamps) - short_start
+        needed = max(count_short, min(recent, count_long))
         messages = self.chat_messages[chat_id]
-        return [msg for msg in messages if msg.timestamp >= cutoff_time]
+        if needed == len(messages):
+            tail = list(messages)
+        else:
+            tail = list(islice(reversed(messages), needed))
+            tail.reverse()
+
+        # 活跃用户：最后发言时间落在窗口内；已被挤出队列的用户顺带清理
+        oldest = timestamps[0]
+        last_seen = self._user_last_seen[chat_id]
+        users_short = 0
+        users_long = 0
+        stale = []
+        for user_id, seen in last_seen.items():
+            if seen < oldest:
+                stale.append(user_id)
+            elif seen >= long_cutoff:
+                users_long += 1
+                if seen >= short_cutoff:
+                    users_short += 1
+        for user_id in stale:
+            del last_seen[user_id]
+
+        messages_short = tail[needed - count_short:] if count_short else []
+        return messages_short, tail[-recent:], count_long, users_short, users_long
 
     def _calculate_atmosphere(self, message_count_5min: int, active_users: int) -> tuple[str, float]:
         """
@@ -214,32 +337,22 @@ class ContextPerception:
         # TODO: 使用NLP技术进行更准确的话题提取
         # 这里使用简单的词频统计
 
-        from collections import Counter
-        import re
-
-        # 合并所有消息
-        all_text = " ".join([msg.content for msg in messages])
-
-        # 简单分词（中文按字符，英文按单词）
-        # 过滤掉常见停用词
-        stopwords = {
-            "的", "了", "是", "在", "我", "你", "他", "她", "它", "们",
-            "这", "那", "和", "与", "及", "或", "吗", "吧", "啊", "呢",
-            "a", "an", "the", "is", "are", "was", "were", "in", "on", "at",
-        }
-
-        # 提取中文词语（2-4个字）和英文单词
-        chinese_words = re.findall(r'[\u4e00-\u9fa5]{2,4}', all_text)
-        english_words = re.findall(r'[a-zA-Z]{3,}', all_text.lower())
-
-        words = chinese_words + english_words
-        words = [w for w in words if w not in stopwords]
-
-        # 统计词频
-        word_freq = Counter(words)
+        # 逐条消息提取中文词语（2-4个字）和英文单词并直接计数，过滤掉常见停用词
+        # 先中文后英文，保持与词频相同时的排序一致
+        word_freq = Counter()
+        for msg in messages:
+            for match in _CN_RE.finditer(msg.content):
+                word = match.group()
+                if word not in _STOPWORDS:
+                    word_freq[word] += 1
+        for msg in messages:
+            for match in _EN_RE.finditer(msg.content.lower()):
+                word = match.group()
+                if word not in _STOPWORDS:
+                    word_freq[word] += 1
 
         # 返回最常见的3个词
-        return [word for word, count in word_freq.most_common(5) if count >= 2]
+        return [word for word, count in word_freq.most_common(3) if count >= 2]
 
     def _calculate_topic_coherence(self, messages: List[MessageRecord]) -> float:
         """
@@ -257,6 +370,12 @@ class ContextPerception:
         # 简化版：基于消息间的时间间隔和长度
         # 如果消息间隔很短且长度适中，认为连贯性较高
 
+        n = len(messages)
+        if n >= _VECTORIZE_MIN_MESSAGES:
+            timestamps = np.fromiter((msg.timestamp for msg in messages), dtype=np.float64, count=n)
+            lengths = np.fromiter((len(msg.content) for msg in messages[1:]), dtype=np.int64, count=n - 1)
+            return float(_coherence_kernel(timestamps, lengths))
+
         total_coherence = 0.0
         for i in range(1, len(messages)):
             prev_msg = messages[i - 1]
@@ -288,22 +407,27 @@ class ContextPerception:
         if not messages:
             return "normal", 0
 
-        # 统计问题数量
-        question_count = sum(1 for msg in messages if "?" in msg.content or "？" in msg.content)
+        # 单次遍历统计问题数量和用户集合
+        question_count = 0
+        users = set()
+        for msg in messages:
+            if msg.qmark_count:
+                question_count += 1
+            users.add(msg.user_id)
 
-        # 统计用户数量
-        unique_users = len(set(msg.user_id for msg in messages))
+        message_count = len(messages)
+        unique_users = len(users)
 
         # 检测是否为辩论（多人，消息较多）
-        if unique_users >= 3 and len(messages) >= 10:
+        if unique_users >= 3 and message_count >= 10:
             return "debate", question_count
 
         # 检测是否为问答模式（问题较多）
-        if question_count / len(messages) > 0.4:
+        if question_count / message_count > 0.4:
             return "qa", question_count
 
         # 检测是否为闲聊（消息较多，用户较多）
-        if len(messages) >= 5 and unique_users >= 2:
+        if message_count >= 5 and unique_users >= 2:
             return "chat", question_count
 
         return "normal", question_count
@@ -318,16 +442,18 @@ class ContextPerception:
         Returns:
             ContextStatus对象
         """
-        # 获取不同时间窗口的消息
-        messages_5min = self._get_messages_in_window(chat_id, 300)
-        messages_1h = self._get_messages_in_window(chat_id, 3600)
+        # 缓存有效期内且没有新消息时直接返回缓存（话题列表另建副本，调用方修改不会影响缓存）
+        cached = self.chat_cache.get(chat_id)
+        if cached is not None and time.time() - cached.timestamp < self.cache_ttl:
+            return replace(cached, current_topics=list(cached.current_topics))
+
+        # 获取不同时间窗口的消息（5分钟、1小时一次收集）
+        messages_5min, recent_1h, message_count_1h, active_users_5min, active_users_1h = self._collect_windows(
+            chat_id, 300, 3600, recent=20
+        )
 
         # 统计数据
         message_count_5min = len(messages_5min)
-        message_count_1h = len(messages_1h)
-
-        active_users_5min = len(set(msg.user_id for msg in messages_5min))
-        active_users_1h = len(set(msg.user_id for msg in messages_1h))
 
         # 计算氛围
         atmosphere, atmosphere_score = self._calculate_atmosphere(message_count_5min, active_users_5min)
@@ -345,7 +471,7 @@ class ContextPerception:
         conversation_pace = self._calculate_conversation_pace(avg_interval)
 
         # 提取话题
-        current_topics = self._extract_topics(messages_1h[-20:])  # 分析最近20条消息
+        current_topics = self._extract_topics(recent_1h)  # 分析最近20条消息
 
         # 计算话题连贯性
         topic_coherence = self._calculate_topic_coherence(messages_5min)
@@ -353,7 +479,7 @@ class ContextPerception:
         # 检测互动模式
         interaction_pattern, question_count = self._detect_interaction_pattern(messages_5min)
 
-        return ContextStatus(
+        status = ContextStatus(
             chat_id=chat_id,
             message_count_5min=message_count_5min,
             message_count_1h=message_count_1h,
@@ -370,3 +496,5 @@ class ContextPerception:
             question_count=question_count,
             timestamp=time.time(),
         )
+        self.chat_cache[chat_id] = status
+        return replace(status, current_topics=list(current_topics))
@@ -11,14 +11,15 @@
 import psutil
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional, Any
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from src.common.logger import get_logger
 
 logger = get_logger("device_perception")
 
 
-@dataclass
+@dataclass(slots=True)
 class DeviceStatus:
     """设备状态数据类"""
 
@@ -64,7 +65,34 @@ class DeviceStatus:
 
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
-        return asdict(self)
+        return {
+            "cpu_percent": self.cpu_percent,
+            "cpu_count": self.cpu_count,
+            "cpu_freq_current": self.cpu_freq_current,
+            "cpu_freq_max": self.cpu_freq_max,
+            "memory_total": self.memory_total,
+            "memory_used": self.memory_used,
+            "memory_percent": self.memory_percent,
+            "memory_available": self.memory_available,
+            "disk_total": self.disk_total,
+            "disk_used": self.disk_used,
+            "disk_percent": self.disk_percent,
+            "disk_free": self.disk_free,
+            "network_sent": self.network_sent,
+            "network_recv": self.network_recv,
+            "network_sent_rate": self.network_sent_rate,
+            "network_recv_rate": self.network_recv_rate,
+            "gpu_available": self.gpu_available,
+            "gpu_percent": self.gpu_percent,
+            "gpu_memory_used": self.gpu_memory_used,
+            "gpu_memory_total": self.gpu_memory_total,
+            "gpu_memory_percent": self.gpu_memory_percent,
+            "gpu_temperature": self.gpu_temperature,
+            "load_avg_1min": self.load_avg_1min,
+            "load_avg_5min": self.load_avg_5min,
+            "load_avg_15min": self.load_avg_15min,
+            "timestamp": self.timestamp,
+        }
 
     def get_status_level(self) -> str:
         """
@@ -111,20 +139,58 @@ class DevicePerception:
     def __init__(self):
         self.last_network_io = None
         self.last_network_time = None
-        self.gpu_available = self._check_gpu_availability()
+
+        # NVML 模块与第一个GPU的句柄在启动采样时获取一次，之后复用
+        self._nvml = None
+        self._gpu_handle = None
+        self._has_gpu_temp = False
+        self.gpu_available = False
+
+        # 进程生命周期内不变的信息只查询一次
+        self._cpu_count = psutil.cpu_count() or 0
+        self._has_loadavg = hasattr(psutil, "getloadavg")
+
+        # GPU 查询走驱动调用，可能阻塞数毫秒：放到单独线程与 psutil 查询并行
+        self._gpu_executor: Optional[ThreadPoolExecutor] = None
+
+        # 磁盘使用率变化缓慢，按路径缓存：path -> (采样时间, 结果)
+        self._disk_cache: Dict[str, tuple[float, Dict[str, Any]]] = {}
+        self._disk_cache_ttl = 30.0
+
+        # 网络速率最小采样间隔：间隔过短时速率噪声大，直接返回上次结果
+        self._net_cache: Optional[Dict[str, Any]] = None
+        self._net_cache_time = 0.0
+        self._net_min_interval = 1.0
 
         # CPU采样优化：后台线程定期采样
         self._cpu_percent_cache = 0.0
-        self._cpu_sample_interval = 2.0  # 默认2秒采样一次
+        self._cpu_sample_interval = 2.0  # 基础采样间隔，默认2秒
+        self._cpu_max_backoff = 8  # 读数稳定时间隔按2倍递增，最多为基础间隔的8倍
+        self._cpu_stable_threshold = 2.0  # 相邻两次读数相差小于该值（百分点）视为稳定
         self._cpu_sampling_lock = threading.Lock()
         self._cpu_sampling_thread = None
         self._stop_sampling = threading.Event()
+        self._lifecycle_lock = threading.Lock()
 
-        # 启动后台CPU采样线程
-        self._start_cpu_sampling()
+        # 初始化GPU查询并启动后台CPU采样线程
+        self.start_sampling()
 
         logger.info(f"设备感知模块初始化完成，GPU可用: {self.gpu_available}, 后台CPU采样已启动")
 
+    def start_sampling(self):
+        """启动后台采样并初始化GPU查询（stop_sampling 之后再次调用即可恢复）"""
+        with self._lifecycle_lock:
+            if self._nvml is None:
+                self.gpu_available = self._check_gpu_availability()
+            if self.gpu_available and self._gpu_executor is None:
+                self._gpu_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="DevicePerception-GPU")
+            self._start_cpu_sampling()
+
+    def _ensure_sampling(self):
+        """已停止采样时（如插件停用后重新启用）在下次使用时自动恢复"""
+        if self._stop_sampling.is_set():
+            self.start_sampling()
+
     def _start_cpu_sampling(self):
         """启动后台CPU采样线程"""
         if self._cpu_sampling_thread and self._cpu_sampling_thread.is_alive():
@@ -144,6 +210,9 @@ class DevicePerception:
         # 首次调用需要interval参数来初始化
         psutil.cpu_percent(interval=0.1)
 
+        interval = self._cpu_sample_interval
+        last_percent = None
+
         while not self._stop_sampling.is_set():
             try:
                 # 非阻塞方式获取CPU使用率（使用上次调用以来的平均值）
@@ -152,36 +221,85 @@ class DevicePerception:
                 with self._cpu_sampling_lock:
                     self._cpu_percent_cache = cpu_percent
 
+                # 自适应采样：读数稳定时间隔翻倍（有上限），出现波动立即回到基础间隔
+                base_interval = self._cpu_sample_interval
+                if last_percent is not None and abs(cpu_percent - last_percent) < self._cpu_stable_threshold:
+                    interval = min(interval * 2, base_interval * self._cpu_max_backoff)
+                else:
+                    interval = base_interval
+                last_percent = cpu_percent
+
                 # 等待下次采样
-                self._stop_sampling.wait(self._cpu_sample_interval)
+                self._stop_sampling.wait(interval)
 
             except Exception as e:
                 logger.error(f"CPU采样失败: {e}")
                 self._stop_sampling.wait(5)  # 出错后等待5秒
 
+    def set_sample_interval(self, seconds: float):
+        """
+        设置CPU后台采样的基础间隔（下一次采样起生效）
+
+        Args:
+            seconds: 采样间隔（秒），最小0.5秒
+        """
+        self._cpu_sample_interval = max(0.5, float(seconds))
+        logger.debug(f"CPU采样基础间隔已设置为 {self._cpu_sample_interval:.1f}s")
+
     def stop_sampling(self):
-        """停止后台采样（清理资源）"""
+        """停止后台采样（清理资源，之后可通过 start_sampling 或下次查询恢复）"""
         logger.debug("正在停止CPU后台采样...")
-        self._stop_sampling.set()
-        if self._cpu_sampling_thread:
-            self._cpu_sampling_thread.join(timeout=3)
+        with self._lifecycle_lock:
+            self._stop_sampling.set()
+            if self._cpu_sampling_thread:
+                self._cpu_sampling_thread.join(timeout=3)
+            if self._gpu_executor:
+                self._gpu_executor.shutdown(wait=True)
+                self._gpu_executor = None
+            if self._nvml is not None:
+                try:
+                    self._nvml.nvmlShutdown()
+                except Exception as e:
+                    logger.error(f"关闭NVML失败: {e}")
+                self.gpu_available = False
+                self._gpu_handle = None
+                self._nvml = None
         logger.info("CPU后台采样已停止")
 
     def _check_gpu_availability(self) -> bool:
-        """检查GPU是否可用"""
+        """检查GPU是否可用（成功时缓存 NVML 模块和第一个GPU的句柄）"""
         try:
             import pynvml
             pynvml.nvmlInit()
-            return True
         except Exception:
             return False
 
+        try:
+            self._gpu_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+        except Exception:
+            # NVML 已初始化但没有可用设备：关闭 NVML，避免句柄泄漏
+            try:
+                pynvml.nvmlShutdown()
+            except Exception as e:
+                logger.error(f"关闭NVML失败: {e}")
+            return False
+        self._nvml = pynvml
+
+        # 探测一次设备是否支持温度读取，避免每次查询都走异常分支
+        try:
+            pynvml.nvmlDeviceGetTemperature(self._gpu_handle, pynvml.NVML_TEMPERATURE_GPU)
+            self._has_gpu_temp = True
+        except Exception:
+            self._has_gpu_temp = False
+        return True
+
     def get_cpu_info(self) -> Dict[str, Any]:
         """
         获取CPU信息（性能优化版 - 无阻塞）
 
         使用后台采样的缓存值，立即返回，不会阻塞
         """
+        self._ensure_sampling()
         try:
             cpu_freq = psutil.cpu_freq()
 
@@ -191,7 +309,7 @@ class DevicePerception:
 
             return {
                 "percent": cpu_percent,
-                "count": psutil.cpu_count(),
+                "count": self._cpu_count,
                 "freq_current": cpu_freq.current if cpu_freq else 0.0,
                 "freq_max": cpu_freq.max if cpu_freq else 0.0,
             }
@@ -224,15 +342,22 @@ class DevicePerception:
             }
 
     def get_disk_info(self, path: str = "/") -> Dict[str, Any]:
-        """获取磁盘信息"""
+        """获取磁盘信息（结果缓存30秒，返回副本）"""
+        now = time.monotonic()
+        cached = self._disk_cache.get(path)
+        if cached is not None and now - cached[0] < self._disk_cache_ttl:
+            return dict(cached[1])
+
         try:
             disk = psutil.disk_usage(path)
-            return {
+            result = {
                 "total": disk.total,
                 "used": disk.used,
                 "percent": disk.percent,
                 "free": disk.free,
             }
+            self._disk_cache[path] = (now, result)
+            return dict(result)
         except Exception as e:
             logger.error(f"获取磁盘信息失败: {e}")
             return {
@@ -243,7 +368,11 @@ class DevicePerception:
             }
 
     def get_network_info(self) -> Dict[str, Any]:
-        """获取网络信息"""
+        """获取网络信息（两次采样至少间隔1秒，返回副本）"""
+        now = time.monotonic()
+        if self._net_cache is not None and now - self._net_cache_time < self._net_min_interval:
+            return dict(self._net_cache)
+
         try:
             current_io = psutil.net_io_counters()
             current_time = time.time()
@@ -265,7 +394,9 @@ class DevicePerception:
             self.last_network_io = current_io
             self.last_network_time = current_time
 
-            return result
+            self._net_cache = result
+            self._net_cache_time = now
+            return dict(result)
         except Exception as e:
             logger.error(f"获取网络信息失败: {e}")
             return {
@@ -288,10 +419,8 @@ class DevicePerception:
             }
 
         try:
-            import pynvml
-
-            # 使用第一个GPU设备
-            handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+            pynvml = self._nvml
+            handle = self._gpu_handle  # 第一个GPU设备
 
             # 获取GPU利用率
             utilization = pynvml.nvmlDeviceGetUtilizationRates(handle)
@@ -299,11 +428,10 @@ class DevicePerception:
             # 获取显存信息
             mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
 
-            # 获取温度
-            try:
-                temperature = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
-            except Exception:
-                temperature = 0.0
+            # 获取温度（不支持温度读取的设备返回0）
+            temperature = (
+                pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU) if self._has_gpu_temp else 0.0
+            )
 
             return {
                 "available": True,
@@ -326,6 +454,13 @@ class DevicePerception:
 
     def get_load_avg(self) -> Dict[str, float]:
         """获取系统负载"""
+        if not self._has_loadavg:
+            return {
+                "1min": 0.0,
+                "5min": 0.0,
+                "15min": 0.0,
+            }
+
         try:
             load = psutil.getloadavg()
             return {
@@ -348,12 +483,17 @@ class DevicePerception:
         Returns:
             DeviceStatus对象
         """
+        self._ensure_sampling()
+
+        # GPU 查询与其余 psutil 查询并行；psutil 各项均为微秒级，直接在当前线程执行
+        gpu_future = self._gpu_executor.submit(self.get_gpu_info) if self._gpu_executor else None
+
         cpu_info = self.get_cpu_info()
         memory_info = self.get_memory_info()
         disk_info = self.get_disk_info()
         network_info = self.get_network_info()
-        gpu_info = self.get_gpu_info()
         load_avg = self.get_load_avg()
+        gpu_info = gpu_future.result() if gpu_future else self.get_gpu_info()
 
         return DeviceStatus(
             # CPU
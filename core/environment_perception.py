@@ -3,16 +3,32 @@
 感知时间、天气、节日等环境信息
 """
 
+import asyncio
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, Optional, Any, List
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, replace
 from src.common.logger import get_logger
 
 logger = get_logger("environment_perception")
 
+# 各月天数（下标0占位，2月按平年计，闰年单独判断）
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
 
-@dataclass
+# 星期与时间段的中文名称
+_WEEKDAY_NAMES = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+_PERIOD_NAMES = {
+    "dawn": "黎明",
+    "morning": "早上",
+    "noon": "中午",
+    "afternoon": "下午",
+    "evening": "傍晚",
+    "night": "晚上",
+    "midnight": "深夜",
+}
+
+
+@dataclass(slots=True)
 class EnvironmentStatus:
     """环境状态数据类"""
 
@@ -43,7 +59,25 @@ class EnvironmentStatus:
 
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
-        return asdict(self)
+        return {
+            "timestamp": self.timestamp,
+            "datetime_str": self.datetime_str,
+            "hour": self.hour,
+            "minute": self.minute,
+            "weekday": self.weekday,
+            "is_weekend": self.is_weekend,
+            "is_workday": self.is_workday,
+            "time_period": self.time_period,
+            "is_holiday": self.is_holiday,
+            "holiday_name": self.holiday_name,
+            "special_date": self.special_date,
+            "weather_available": self.weather_available,
+            "weather_description": self.weather_description,
+            "temperature": self.temperature,
+            "humidity": self.humidity,
+            "weather_code": self.weather_code,
+            "season": self.season,
+        }
 
     def get_human_readable_summary(self) -> str:
         """获取人类可读的环境摘要"""
@@ -68,19 +102,8 @@ class EnvironmentStatus:
 
     def _get_time_description(self) -> str:
         """获取时间描述"""
-        weekday_names = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
-        period_names = {
-            "dawn": "黎明",
-            "morning": "早上",
-            "noon": "中午",
-            "afternoon": "下午",
-            "evening": "傍晚",
-            "night": "晚上",
-            "midnight": "深夜",
-        }
-
-        weekday_str = weekday_names[self.weekday]
-        period_str = period_names.get(self.time_period, "")
+        weekday_str = _WEEKDAY_NAMES[self.weekday]
+        period_str = _PERIOD_NAMES.get(self.time_period, "")
 
         return f"{period_str}，{weekday_str}"
 
@@ -88,19 +111,19 @@ class EnvironmentStatus:
 class EnvironmentPerception:
     """环境感知器"""
 
-    # 中国法定节假日（简化版，实际应该从API获取）
+    # 中国法定节假日（简化版，实际应该从API获取），键为 月*100+日
     CHINESE_HOLIDAYS = {
-        "01-01": "元旦",
-        "02-14": "情人节",
-        "03-08": "妇女节",
-        "04-04": "清明节",
-        "04-05": "清明节",
-        "05-01": "劳动节",
-        "05-04": "青年节",
-        "06-01": "儿童节",
-        "08-15": "中秋节",  # 农历，这里简化
-        "10-01": "国庆节",
-        "12-25": "圣诞节",
+        101: "元旦",
+        214: "情人节",
+        308: "妇女节",
+        404: "清明节",
+        405: "清明节",
+        501: "劳动节",
+        504: "青年节",
+        601: "儿童节",
+        815: "中秋节",  # 农历，这里简化
+        1001: "国庆节",
+        1225: "圣诞节",
     }
 
     # 农历节日（需要农历转换库支持）
@@ -113,6 +136,28 @@ class EnvironmentPerception:
         "重阳节": "农历九月初九",
     }
 
+    # 小时 -> 时间段查找表
+    # 0-4 深夜，4-6 黎明，6-12 早上，12-13 中午，13-18 下午，18-20 傍晚，20-24 晚上
+    _HOUR_TO_PERIOD = (
+        ("midnight",) * 4
+        + ("dawn",) * 2
+        + ("morning",) * 6
+        + ("noon",)
+        + ("afternoon",) * 5
+        + ("evening",) * 2
+        + ("night",) * 4
+    )
+
+    # 月份 -> 季节查找表（下标0占位）
+    _MONTH_TO_SEASON = (
+        None,
+        "winter", "winter",
+        "spring", "spring", "spring",
+        "summer", "summer", "summer",
+        "autumn", "autumn", "autumn",
+        "winter",
+    )
+
     def __init__(self, enable_weather: bool = False, weather_api_key: Optional[str] = None, location: str = ""):
         """
         初始化环境感知器
@@ -128,7 +173,17 @@ class EnvironmentPerception:
 
         self.weather_cache: Optional[Dict[str, Any]] = None
         self.weather_cache_time: float = 0.0
-        self.weather_cache_duration: float = 1800  # 30分钟缓存
+        self.weather_cache_duration: float = 1800  # 30分钟缓存，刷新时刻对齐到整半小时
+        self.weather_negative_cache_duration: float = 60  # 获取失败后60秒内不再重试
+        # 缓存时间与刷新时刻均基于 time.monotonic()，不受系统时钟回拨影响
+        self._weather_next_refresh: float = float("-inf")
+        self._weather_inflight: Optional[asyncio.Task] = None
+
+        # 按分钟缓存环境状态：同一分钟内时间段、节日、季节等字段不变
+        self._status_cache_minute: int = -1
+        self._status_cache: Optional[EnvironmentStatus] = None
+        self._status_cache_weather: Optional[Dict[str, Any]] = None
+        self._status_cache_prefix: str = ""
 
         logger.info(f"环境感知模块初始化完成，天气感知: {enable_weather}")
 
@@ -142,20 +197,7 @@ class EnvironmentPerception:
         Returns:
             时间段标识
         """
-        if 4 <= hour < 6:
-            return "dawn"  # 黎明
-        elif 6 <= hour < 12:
-            return "morning"  # 早上
-        elif 12 <= hour < 13:
-            return "noon"  # 中午
-        elif 13 <= hour < 18:
-            return "afternoon"  # 下午
-        elif 18 <= hour < 20:
-            return "evening"  # 傍晚
-        elif 20 <= hour < 24:
-            return "night"  # 晚上
-        else:
-            return "midnight"  # 深夜
+        return self._HOUR_TO_PERIOD[hour]
 
     def get_season(self, month: int) -> str:
         """
@@ -167,14 +209,7 @@ class EnvironmentPerception:
         Returns:
             季节标识
         """
-        if month in [3, 4, 5]:
-            return "spring"
-        elif month in [6, 7, 8]:
-            return "summer"
-        elif month in [9, 10, 11]:
-            return "autumn"
-        else:
-            return "winter"
+        return self._MONTH_TO_SEASON[month]
 
     def check_holiday(self, date: datetime) -> tuple[bool, str]:
         """
@@ -186,10 +221,9 @@ class EnvironmentPerception:
         Returns:
             (是否为节日, 节日名称)
         """
-        date_str = date.strftime("%m-%d")
-
-        if date_str in self.CHINESE_HOLIDAYS:
-            return True, self.CHINESE_HOLIDAYS[date_str]
+        holiday_name = self.CHINESE_HOLIDAYS.get(date.month * 100 + date.day)
+        if holiday_name is not None:
+            return True, holiday_name
 
         # TODO: 添加农历节日支持，需要农历转换库
         # 这里可以集成 lunarcalendar 或 chinese-calendar 库
@@ -213,8 +247,9 @@ class EnvironmentPerception:
             return "月中"
 
         # 检查最后一天
-        next_month = date.replace(day=28) + timedelta(days=4)
-        last_day = (next_month - timedelta(days=next_month.day)).day
+        last_day = _DAYS_IN_MONTH[date.month]
+        if date.month == 2 and date.year % 4 == 0 and (date.year % 100 != 0 or date.year % 400 == 0):
+            last_day = 29
         if date.day == last_day:
             return f"{date.month}月的最后一天"
 
@@ -230,33 +265,59 @@ class EnvironmentPerception:
         if not self.enable_weather:
             return None
 
-        # 检查缓存
-        current_time = time.time()
-        if self.weather_cache and (current_time - self.weather_cache_time) < self.weather_cache_duration:
+        # 检查缓存（包括失败结果的短期缓存）
+        if time.monotonic() < self._weather_next_refresh:
             return self.weather_cache
 
+        # 并发调用共享同一次请求；shield 避免某个调用方被取消时连带取消请求
+        if self._weather_inflight is None:
+            self._weather_inflight = asyncio.ensure_future(self._refresh_weather())
+        return await asyncio.shield(self._weather_inflight)
+
+    async def _refresh_weather(self) -> Optional[Dict[str, Any]]:
+        """刷新天气缓存"""
+        try:
+            weather_info = await self._fetch_weather_info()
+        except Exception as e:
+            logger.error(f"获取天气信息失败: {e}")
+            weather_info = None
+        finally:
+            self._weather_inflight = None
+
+        current_time = time.monotonic()
+        self.weather_cache = weather_info
+        if weather_info is not None:
+            self.weather_cache_time = current_time
+            # 对齐到下一个整半小时（按墙上时钟计算剩余秒数），所有聊天在同一时刻统一刷新
+            duration = self.weather_cache_duration
+            self._weather_next_refresh = current_time + (duration - time.time() % duration)
+        else:
+            self._weather_next_refresh = current_time + self.weather_negative_cache_duration
+        return weather_info
+
+    async def _fetch_weather_info(self) -> Optional[Dict[str, Any]]:
+        """
+        调用天气API获取天气信息
+
+        Returns:
+            天气信息字典，如果失败则返回None
+        """
         # TODO: 实现天气API调用
         # 这里可以集成 OpenWeatherMap、和风天气、心知天气等API
         # 示例实现（需要实际API）:
         """
-        try:
-            import aiohttp
-            async with aiohttp.ClientSession() as session:
-                url = f"https://api.openweathermap.org/data/2.5/weather?q={self.location}&appid={self.weather_api_key}&units=metric&lang=zh_cn"
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        weather_info = {
-                            "description": data["weather"][0]["description"],
-                            "temperature": data["main"]["temp"],
-                            "humidity": data["main"]["humidity"],
-                            "code": data["weather"][0]["main"],
-                        }
-                        self.weather_cache = weather_info
-                        self.weather_cache_time = current_time
-                        return weather_info
-        except Exception as e:
-            logger.error(f"获取天气信息失败: {e}")
+        import aiohttp
+        async with aiohttp.ClientSession() as session:
+            url = f"https://api.openweathermap.org/data/2.5/weather?q={self.location}&appid={self.weather_api_key}&units=metric&lang=zh_cn"
+            async with session.get(url) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return {
+                        "description": data["weather"][0]["description"],
+                        "temperature": data["main"]["temp"],
+                        "humidity": data["main"]["humidity"],
+                        "code": data["weather"][0]["main"],
+                    }
         """
 
         return None
@@ -268,7 +329,27 @@ class EnvironmentPerception:
         Returns:
             EnvironmentStatus对象
         """
-        now = datetime.now()
+        timestamp = time.time()
+        seconds = int(timestamp)
+        minute_key = seconds // 60
+
+        # 天气信息
+        weather_info = await self.get_weather_info()
+
+        # 同一分钟且天气结果未变化时复用缓存，只刷新时间戳和秒
+        cached = self._status_cache
+        if (
+            cached is not None
+            and minute_key == self._status_cache_minute
+            and weather_info is self._status_cache_weather
+        ):
+            return replace(
+                cached,
+                timestamp=timestamp,
+                datetime_str=f"{self._status_cache_prefix}{seconds % 60:02d}",
+            )
+
+        now = datetime.fromtimestamp(timestamp)
 
         # 时间信息
         hour = now.hour
@@ -285,13 +366,12 @@ class EnvironmentPerception:
         # 季节
         season = self.get_season(now.month)
 
-        # 天气信息
-        weather_info = await self.get_weather_info()
         weather_available = weather_info is not None
+        prefix = f"{now.year:04d}-{now.month:02d}-{now.day:02d} {hour:02d}:{minute:02d}:"
 
-        return EnvironmentStatus(
-            timestamp=time.time(),
-            datetime_str=now.strftime("%Y-%m-%d %H:%M:%S"),
+        status = EnvironmentStatus(
+            timestamp=timestamp,
+            datetime_str=f"{prefix}{now.second:02d}",
             hour=hour,
             minute=minute,
             weekday=weekday,
@@ -308,3 +388,9 @@ class EnvironmentPerception:
             weather_code=weather_info.get("code", "") if weather_info else "",
             season=season,
         )
+
+        self._status_cache_minute = minute_key
+        self._status_cache = status
+        self._status_cache_weather = weather_info
+        self._status_cache_prefix = prefix
+        return status
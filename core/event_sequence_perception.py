@@ -3,17 +3,25 @@
 记录和分析重要事件、里程碑、周期性事件等
 """
 
+import bisect
+import heapq
+import re
+import sys
 import time
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Any, List
-from dataclasses import dataclass, asdict
-from collections import defaultdict
+from dataclasses import dataclass, field
+from collections import Counter
+from operator import attrgetter
 from src.common.logger import get_logger
 
 logger = get_logger("event_sequence_perception")
 
+# 按时间戳排序的 key（C 实现，比 lambda 快）
+_BY_TIMESTAMP = attrgetter("timestamp")
 
-@dataclass
+
+@dataclass(slots=True)
 class Event:
     """事件数据类"""
 
@@ -22,29 +30,38 @@ class Event:
     title: str
     description: str = ""
     timestamp: float = 0.0
-    participants: List[str] = None  # 参与者user_id列表
+    participants: List[str] = field(default_factory=list)  # 参与者user_id列表
     importance: int = 1  # 重要性 1-5
-    tags: List[str] = None  # 标签
+    tags: List[str] = field(default_factory=list)  # 标签
     recurrence: str = "none"  # "none" | "daily" | "weekly" | "monthly" | "yearly"
     chat_id: str = ""
 
-    def __post_init__(self):
-        if self.participants is None:
-            self.participants = []
-        if self.tags is None:
-            self.tags = []
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（浅拷贝，列表字段直接引用，调用方不应修改）"""
+        return {
+            "event_id": self.event_id,
+            "event_type": self.event_type,
+            "title": self.title,
+            "description": self.description,
+            "timestamp": self.timestamp,
+            "participants": self.participants,
+            "importance": self.importance,
+            "tags": self.tags,
+            "recurrence": self.recurrence,
+            "chat_id": self.chat_id,
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class EventSequenceStatus:
     """事件序列状态数据类"""
 
     chat_id: str = ""
 
     # 事件列表
-    recent_events: List[Event] = None  # 最近事件
-    upcoming_events: List[Event] = None  # 即将到来的事件
-    milestone_events: List[Event] = None  # 里程碑事件
+    recent_events: List[Event] = field(default_factory=list)  # 最近事件
+    upcoming_events: List[Event] = field(default_factory=list)  # 即将到来的事件
+    milestone_events: List[Event] = field(default_factory=list)  # 里程碑事件
 
     # 统计
     total_events: int = 0
@@ -52,7 +69,7 @@ class EventSequenceStatus:
     events_this_week: int = 0
 
     # 周期性事件
-    recurring_events: List[Event] = None  # 周期性事件
+    recurring_events: List[Event] = field(default_factory=list)  # 周期性事件
     next_recurring_event: Optional[Event] = None  # 下一个周期性事件
 
     # 时间线分析
@@ -62,20 +79,23 @@ class EventSequenceStatus:
     # 时间戳
     timestamp: float = 0.0
 
-    def __post_init__(self):
-        if self.recent_events is None:
-            self.recent_events = []
-        if self.upcoming_events is None:
-            self.upcoming_events = []
-        if self.milestone_events is None:
-            self.milestone_events = []
-        if self.recurring_events is None:
-            self.recurring_events = []
-
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        data = asdict(self)
-        return data
+        """转换为字典（浅拷贝，事件内的列表字段直接引用，调用方不应修改）"""
+        next_recurring = self.next_recurring_event
+        return {
+            "chat_id": self.chat_id,
+            "recent_events": [e.to_dict() for e in self.recent_events],
+            "upcoming_events": [e.to_dict() for e in self.upcoming_events],
+            "milestone_events": [e.to_dict() for e in self.milestone_events],
+            "total_events": self.total_events,
+            "events_this_month": self.events_this_month,
+            "events_this_week": self.events_this_week,
+            "recurring_events": [e.to_dict() for e in self.recurring_events],
+            "next_recurring_event": next_recurring.to_dict() if next_recurring is not None else None,
+            "avg_event_interval_days": self.avg_event_interval_days,
+            "most_active_period": self.most_active_period,
+            "timestamp": self.timestamp,
+        }
 
     def get_human_readable_summary(self) -> str:
         """获取人类可读的事件序列摘要"""
@@ -101,6 +121,9 @@ class EventSequenceStatus:
 class EventSequencePerception:
     """事件序列感知器"""
 
+    # 读路径未命中时共享的只读空序列
+    _EMPTY: tuple = ()
+
     def __init__(self, auto_detect: bool = True):
         """
         初始化事件序列感知器
@@ -110,7 +133,16 @@ class EventSequencePerception:
         """
         # 存储事件
         # {chat_id: [Event, ...]}
-        self.events: Dict[str, List[Event]] = defaultdict(list)
+        self.events: Dict[str, List[Event]] = {}
+        # 与 events 平行的有序时间戳列表，用于二分查找
+        # {chat_id: [timestamp, ...]}
+        self._event_timestamps: Dict[str, List[float]] = {}
+        # 按月份增量统计的事件数，月份以整数 year*12+(month-1) 表示
+        # {chat_id: Counter({year_month: count})}
+        self._monthly_counts: Dict[str, Counter] = {}
+        # 每个聊天单调递增的事件序号，用于生成 event_id
+        # {chat_id: next_seq}
+        self._event_counters: Dict[str, int] = {}
 
         # 是否启用自动检测
         self.auto_detect = auto_detect
@@ -122,6 +154,12 @@ class EventSequencePerception:
             "milestone": ["里程碑", "达成", "milestone", "成就"],
         }
 
+        # 所有关键词合并为一个正则，作为快速预筛：绝大多数消息一次扫描即可排除
+        # 命中后仍按类型逐个 in 判断：每种类型各产生一个事件，且短关键词的 in 比带命名分组的正则更快
+        self._keyword_pattern = re.compile(
+            "|".join(re.escape(keyword) for keywords in self.auto_detect_keywords.values() for keyword in keywords)
+        )
+
         logger.info(f"事件序列感知模块初始化完成，自动检测: {'启用' if auto_detect else '禁用'}")
 
     def add_event(
@@ -156,7 +194,20 @@ class EventSequencePerception:
         if timestamp is None:
             timestamp = time.time()
 
-        event_id = f"{chat_id}_{int(timestamp)}_{len(self.events[chat_id])}"
+        # 类型和重复模式取值有限，驻留后过滤时的相等比较可走指针快路径
+        event_type = sys.intern(event_type)
+        recurrence = sys.intern(recurrence)
+
+        events = self.events.get(chat_id)
+        if events is None:
+            events = self.events[chat_id] = []
+            self._event_timestamps[chat_id] = []
+            self._monthly_counts[chat_id] = Counter()
+            self._event_counters[chat_id] = 0
+
+        seq = self._event_counters[chat_id]
+        self._event_counters[chat_id] = seq + 1
+        event_id = f"{chat_id}_{int(timestamp)}_{seq}"
 
         event = Event(
             event_id=event_id,
@@ -171,10 +222,13 @@ class EventSequencePerception:
             chat_id=chat_id,
         )
 
-        self.events[chat_id].append(event)
-
-        # 按时间排序
-        self.events[chat_id].sort(key=lambda e: e.timestamp)
+        # 按时间有序插入（相同时间戳排在已有事件之后，与稳定排序一致）
+        timestamps = self._event_timestamps[chat_id]
+        index = bisect.bisect_right(timestamps, timestamp)
+        timestamps.insert(index, timestamp)
+        events.insert(index, event)
+        dt = datetime.fromtimestamp(timestamp)
+        self._monthly_counts[chat_id][dt.year * 12 + dt.month - 1] += 1
 
         logger.debug(f"添加事件: {title} ({event_type})")
 
@@ -196,6 +250,9 @@ class EventSequencePerception:
             user_id: 用户ID
             timestamp: 时间戳
         """
+        if not self._keyword_pattern.search(message_content):
+            return
+
         if timestamp is None:
             timestamp = time.time()
 
@@ -219,63 +276,73 @@ class EventSequencePerception:
 
     def get_recent_events(self, chat_id: str, limit: int = 10) -> List[Event]:
         """获取最近事件"""
-        events = self.events.get(chat_id, [])
-        # 返回最近的N个事件
-        return sorted(events, key=lambda e: e.timestamp, reverse=True)[:limit]
+        events = self.events.get(chat_id)
+        if not events or limit <= 0:
+            return []
+
+        # 事件已按时间有序，只需在尾部（含与边界时间戳相同的事件）取最大的N个
+        timestamps = self._event_timestamps[chat_id]
+        start = bisect.bisect_left(timestamps, timestamps[-min(limit, len(timestamps))])
+        return heapq.nlargest(limit, events[start:], key=_BY_TIMESTAMP)
 
     def get_upcoming_events(self, chat_id: str, days_ahead: int = 30, limit: int = 5) -> List[Event]:
         """获取即将到来的事件"""
         now = time.time()
         future_time = now + (days_ahead * 86400)
 
-        events = self.events.get(chat_id, [])
-        upcoming = [e for e in events if now < e.timestamp <= future_time]
+        events = self.events.get(chat_id)
+        if not events:
+            return []
 
-        return sorted(upcoming, key=lambda e: e.timestamp)[:limit]
+        # 事件已按时间有序，二分定位 (now, future_time] 区间后切片
+        timestamps = self._event_timestamps[chat_id]
+        lo = bisect.bisect_right(timestamps, now)
+        hi = bisect.bisect_right(timestamps, future_time, lo)
+        return events[lo:min(hi, lo + max(limit, 0))]
 
     def get_milestone_events(self, chat_id: str) -> List[Event]:
         """获取里程碑事件"""
-        events = self.events.get(chat_id, [])
+        events = self.events.get(chat_id, self._EMPTY)
         milestones = [e for e in events if e.event_type == "milestone"]
-        return sorted(milestones, key=lambda e: e.timestamp, reverse=True)
+        return sorted(milestones, key=_BY_TIMESTAMP, reverse=True)
 
     def get_recurring_events(self, chat_id: str) -> List[Event]:
         """获取周期性事件"""
-        events = self.events.get(chat_id, [])
+        events = self.events.get(chat_id, self._EMPTY)
         return [e for e in events if e.recurrence != "none"]
 
-    def _calculate_event_interval(self, events: List[Event]) -> float:
-        """计算平均事件间隔（天）"""
-        if len(events) < 2:
+    def _collect_buckets(self, events: List[Event]) -> tuple[List[Event], List[Event]]:
+        """单次遍历有序事件列表，同时收集里程碑事件和周期性事件"""
+        milestones = []
+        recurring = []
+        for event in events:
+            if event.event_type == "milestone":
+                milestones.append(event)
+            if event.recurrence != "none":
+                recurring.append(event)
+
+        # 输入已有序，逆序稳定排序接近线性
+        milestones.sort(key=_BY_TIMESTAMP, reverse=True)
+        return milestones, recurring
+
+    def _calculate_event_interval(self, timestamps: List[float]) -> float:
+        """计算平均事件间隔（天），timestamps 需已按时间排序"""
+        if len(timestamps) < 2:
             return 0.0
 
-        sorted_events = sorted(events, key=lambda e: e.timestamp)
-        intervals = []
+        # 相邻间隔之和可裂项为首尾之差，O(1) 求平均
+        return (timestamps[-1] - timestamps[0]) / 86400 / (len(timestamps) - 1)  # 转换为天
 
-        for i in range(1, len(sorted_events)):
-            interval = sorted_events[i].timestamp - sorted_events[i-1].timestamp
-            intervals.append(interval / 86400)  # 转换为天
-
-        return sum(intervals) / len(intervals) if intervals else 0.0
-
-    def _find_most_active_period(self, events: List[Event]) -> str:
+    def _find_most_active_period(self, chat_id: str) -> str:
         """找出最活跃的时期"""
-        if not events:
-            return ""
-
-        # 按月份统计
-        monthly_counts = defaultdict(int)
-
-        for event in events:
-            dt = datetime.fromtimestamp(event.timestamp)
-            month_key = dt.strftime("%Y-%m")
-            monthly_counts[month_key] += 1
-
+        monthly_counts = self._monthly_counts.get(chat_id)
         if not monthly_counts:
             return ""
 
-        most_active_month = max(monthly_counts, key=monthly_counts.get)
-        return most_active_month
+        # 计数相同时取最早的月份
+        max_count = max(monthly_counts.values())
+        year_month = min(month for month, count in monthly_counts.items() if count == max_count)
+        return f"{year_month // 12:04d}-{year_month % 12 + 1:02d}"
 
     def get_event_sequence_status(self, chat_id: str) -> EventSequenceStatus:
         """
@@ -287,25 +354,26 @@ class EventSequencePerception:
         Returns:
             EventSequenceStatus对象
         """
-        events = self.events.get(chat_id, [])
+        events = self.events.get(chat_id, self._EMPTY)
 
-        # 获取各类事件
+        # 获取各类事件：最近/即将到来的事件走二分，里程碑和周期性事件合并为一次遍历
         recent_events = self.get_recent_events(chat_id, 10)
         upcoming_events = self.get_upcoming_events(chat_id, 30, 5)
-        milestone_events = self.get_milestone_events(chat_id)
-        recurring_events = self.get_recurring_events(chat_id)
+        milestone_events, recurring_events = self._collect_buckets(events)
 
         # 统计本周/本月事件
         now = time.time()
         week_ago = now - (7 * 86400)
         month_ago = now - (30 * 86400)
 
-        events_this_week = len([e for e in events if e.timestamp >= week_ago])
-        events_this_month = len([e for e in events if e.timestamp >= month_ago])
+        # 时间戳列表有序，二分计数即为 O(log n)；单次标量查询时 bisect 比 numpy.searchsorted 更快
+        timestamps = self._event_timestamps.get(chat_id, self._EMPTY)
+        events_this_week = len(timestamps) - bisect.bisect_left(timestamps, week_ago)
+        events_this_month = len(timestamps) - bisect.bisect_left(timestamps, month_ago)
 
         # 计算间隔和活跃期
-        avg_interval = self._calculate_event_interval(events)
-        most_active = self._find_most_active_period(events)
+        avg_interval = self._calculate_event_interval(timestamps)
+        most_active = self._find_most_active_period(chat_id)
 
         # 下一个周期性事件
         next_recurring = upcoming_events[0] if upcoming_events and upcoming_events[0].recurrence != "none" else None
@@ -0,0 +1,15 @@
+"""
+numba 可选依赖支持
+各模块的数值内核在 HAS_NUMBA 为真时用 njit 编译，否则使用各自的 numpy 回退实现。
+内核在首次调用时才编译（cache=True 时之后从磁盘缓存加载），导入模块不承担编译开销。
+"""
+
+try:
+    from numba import njit
+
+    HAS_NUMBA = True
+except ImportError:  # numba 为可选依赖，缺失时回退到 numpy 实现
+    njit = None
+    HAS_NUMBA = False
+
+__all__ = ["HAS_NUMBA", "njit"]
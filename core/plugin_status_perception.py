@@ -3,15 +3,38 @@
 监控自身插件系统的状态、健康度、使用情况等
 """
 
+import json
+import os
 import time
+from functools import lru_cache
 from typing import Dict, Optional, Any, List
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, replace
 from collections import defaultdict
 from src.common.logger import get_logger
 
 logger = get_logger("plugin_status_perception")
 
 
+@lru_cache(maxsize=None)
+def _type_name(component_type) -> str:
+    """组件类型名称（按类型对象缓存，避免每个组件都调用一次 str()）"""
+    return str(component_type)
+
+
+# 组件类型名称中的关键字 -> 使用说明中的分类（按顺序匹配）
+_USAGE_CATEGORIES = (("command", "commands"), ("tool", "tools"), ("event", "event_handlers"))
+
+
+@lru_cache(maxsize=None)
+def _usage_category(component_type) -> Optional[str]:
+    """组件在使用说明中的分类，不属于任何分类时返回None"""
+    type_name = str(component_type).lower()
+    for keyword, category in _USAGE_CATEGORIES:
+        if keyword in type_name:
+            return category
+    return None
+
+
 @dataclass
 class PluginStatusInfo:
     """单个插件状态信息"""
@@ -49,6 +72,38 @@ class PluginStatusInfo:
         if self.python_dependencies is None:
             self.python_dependencies = []
 
+    def copy(self) -> "PluginStatusInfo":
+        """复制插件信息（容器字段另建副本）"""
+        return PluginStatusInfo(
+            **{
+                **self.__dict__,
+                "component_types": dict(self.component_types),
+                "dependencies": list(self.dependencies),
+                "python_dependencies": list(self.python_dependencies),
+            }
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（容器字段复制一份，依赖列表可能直接引用注册表中的对象）"""
+        return {
+            "plugin_name": self.plugin_name,
+            "display_name": self.display_name,
+            "version": self.version,
+            "author": self.author,
+            "description": self.description,
+            "is_enabled": self.is_enabled,
+            "is_loaded": self.is_loaded,
+            "has_error": self.has_error,
+            "error_message": self.error_message,
+            "total_components": self.total_components,
+            "enabled_components": self.enabled_components,
+            "component_types": dict(self.component_types),
+            "dependencies": list(self.dependencies),
+            "python_dependencies": list(self.python_dependencies),
+            "is_built_in": self.is_built_in,
+            "plugin_path": self.plugin_path,
+        }
+
 
 @dataclass
 class PluginSystemStatus:
@@ -88,9 +143,22 @@ class PluginSystemStatus:
             self.failed_plugin_names = []
 
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        data = asdict(self)
-        return data
+        """转换为字典（容器字段复制一份，状态对象会被缓存复用，调用方修改不会影响缓存）"""
+        return {
+            "total_plugins": self.total_plugins,
+            "enabled_plugins": self.enabled_plugins,
+            "loaded_plugins": self.loaded_plugins,
+            "failed_plugins": self.failed_plugins,
+            "total_components": self.total_components,
+            "enabled_components": self.enabled_components,
+            "components_by_type": dict(self.components_by_type),
+            "all_plugins": [plugin.to_dict() for plugin in self.all_plugins],
+            "enabled_plugin_names": list(self.enabled_plugin_names),
+            "failed_plugin_names": list(self.failed_plugin_names),
+            "system_health": self.system_health,
+            "health_score": self.health_score,
+            "timestamp": self.timestamp,
+        }
 
     def get_human_readable_summary(self) -> str:
         """获取人类可读的插件系统摘要"""
@@ -114,14 +182,35 @@ class PluginSystemStatus:
         return "，".join(parts)
 
 
+def _copy_status(status: PluginSystemStatus) -> PluginSystemStatus:
+    """复制缓存中的插件系统状态（容器字段及插件信息另建副本，调用方修改不会影响缓存）"""
+    return replace(
+        status,
+        components_by_type=dict(status.components_by_type),
+        all_plugins=[info.copy() for info in status.all_plugins],
+        enabled_plugin_names=list(status.enabled_plugin_names),
+        failed_plugin_names=list(status.failed_plugin_names),
+        timestamp=time.time(),
+    )
+
+
 class PluginStatusPerception:
     """插件状态感知器"""
 
+    # 插件系统状态缓存有效期（秒）
+    STATUS_CACHE_TTL = 1.0
+
     def __init__(self):
         """初始化插件状态感知器"""
         self.plugin_manager = None
         self.component_registry = None
 
+        # 插件系统状态缓存：(过期时间, 版本键, 状态)
+        self._status_cache: Optional[tuple[float, tuple, PluginSystemStatus]] = None
+
+        # 插件目录文件缓存：{文件路径: (修改时间ns, 文件内容)}
+        self._file_cache: Dict[str, tuple[int, str]] = {}
+
         # 尝试导入插件管理器
         try:
             from src.plugin_system.core.plugin_manager import plugin_manager
@@ -162,12 +251,14 @@ class PluginStatusPerception:
         # 统计组件
         components = plugin_info.components
         total_components = len(components)
-        enabled_components = sum(1 for c in components if c.enabled)
 
-        # 按类型统计组件
+        # 已启用数与按类型统计一次遍历完成
+        enabled_components = 0
         component_types = defaultdict(int)
         for component in components:
-            component_types[str(component.component_type)] += 1
+            if component.enabled:
+                enabled_components += 1
+            component_types[_type_name(component.component_type)] += 1
 
         # Python依赖
         python_deps = []
@@ -229,28 +320,37 @@ class PluginStatusPerception:
                 timestamp=time.time(),
             )
 
+        # 短时间内插件及组件启用状态、加载和失败数量都没变时直接复用上次结果
+        now = time.monotonic()
+        version_key = self._status_version_key()
+        cached = self._status_cache
+        if cached is not None and now < cached[0] and cached[1] == version_key:
+            return _copy_status(cached[2])
+
         # 获取所有插件信息
         all_plugins = self.get_all_plugins_info()
 
-        # 统计数据
+        # 插件、组件统计及名称列表一次遍历完成
         total_plugins = len(all_plugins)
-        enabled_plugins = sum(1 for p in all_plugins if p.is_enabled)
-        loaded_plugins = sum(1 for p in all_plugins if p.is_loaded)
-        failed_plugins = sum(1 for p in all_plugins if p.has_error)
-
-        # 组件统计
-        total_components = sum(p.total_components for p in all_plugins)
-        enabled_components = sum(p.enabled_components for p in all_plugins)
-
-        # 按类型统计组件
+        loaded_plugins = 0
+        total_components = 0
+        enabled_components = 0
         components_by_type = defaultdict(int)
+        enabled_plugin_names = []
+        failed_plugin_names = []
         for plugin in all_plugins:
+            if plugin.is_enabled:
+                enabled_plugin_names.append(plugin.plugin_name)
+            if plugin.is_loaded:
+                loaded_plugins += 1
+            if plugin.has_error:
+                failed_plugin_names.append(plugin.plugin_name)
+            total_components += plugin.total_components
+            enabled_components += plugin.enabled_components
             for comp_type, count in plugin.component_types.items():
                 components_by_type[comp_type] += count
-
-        # 获取插件名称列表
-        enabled_plugin_names = [p.plugin_name for p in all_plugins if p.is_enabled]
-        failed_plugin_names = [p.plugin_name for p in all_plugins if p.has_error]
+        enabled_plugins = len(enabled_plugin_names)
+        failed_plugins = len(failed_plugin_names)
 
         # 计算健康度
         health_score = 100.0
@@ -273,7 +373,7 @@ class PluginStatusPerception:
         else:
             system_health = "critical"
 
-        return PluginSystemStatus(
+        status = PluginSystemStatus(
             total_plugins=total_plugins,
             enabled_plugins=enabled_plugins,
             loaded_plugins=loaded_plugins,
@@ -288,6 +388,18 @@ class PluginStatusPerception:
             health_score=health_score,
             timestamp=time.time(),
         )
+        self._status_cache = (now + self.STATUS_CACHE_TTL, version_key, status)
+        return _copy_status(status)
+
+    def _status_version_key(self) -> tuple:
+        """插件系统状态的版本键：各插件及其组件的启用状态、加载和失败插件数，任一变化即视为缓存失效"""
+        plugins = self.component_registry._plugins.values()
+        return (
+            tuple(info.enabled for info in plugins),
+            tuple(component.enabled for info in plugins for component in info.components),
+            len(self.plugin_manager.loaded_plugins),
+            len(self.plugin_manager.failed_plugins),
+        )
 
     async def enable_plugin(self, plugin_name: str) -> bool:
         """
@@ -336,6 +448,7 @@ class PluginStatusPerception:
 
             # 更新插件启用状态
             plugin_info.enabled = True
+            self._status_cache = None
 
             logger.info(f"✅ 已启用插件 {plugin_name}，共 {total_components} 个组件")
             return True  # 只要插件状态更新成功就返回True
@@ -391,6 +504,7 @@ class PluginStatusPerception:
 
             # 更新插件禁用状态
             plugin_info.enabled = False
+            self._status_cache = None
 
             logger.info(f"⛔ 已禁用插件 {plugin_name}，共 {total_components} 个组件")
             return True  # 只要插件状态更新成功就返回True
@@ -473,9 +587,6 @@ class PluginStatusPerception:
         Returns:
             包含插件使用说明的字典
         """
-        import os
-        import json
-
         if not self.plugin_manager:
             return {"error": "插件管理器不可用"}
 
@@ -503,41 +614,60 @@ class PluginStatusPerception:
         }
 
         # 读取 README.md
-        readme_path = os.path.join(plugin_path, "README.md")
-        if os.path.exists(readme_path):
-            try:
-                with open(readme_path, "r", encoding="utf-8") as f:
-                    usage_info["readme"] = f.read()
+        try:
+            readme = self._read_plugin_file(os.path.join(plugin_path, "README.md"))
+            if readme is not None:
+                usage_info["readme"] = readme
                 logger.debug(f"成功读取插件 {plugin_name} 的 README.md")
-            except Exception as e:
-                logger.warning(f"读取 README.md 失败: {e}")
+        except Exception as e:
+            logger.warning(f"读取 README.md 失败: {e}")
 
         # 读取 _manifest.json
-        manifest_path = os.path.join(plugin_path, "_manifest.json")
-        if os.path.exists(manifest_path):
-            try:
-                with open(manifest_path, "r", encoding="utf-8") as f:
-                    usage_info["manifest"] = json.load(f)
+        try:
+            # 缓存的是原始文本，每次重新解析，调用方拿到的字典可以随意修改
+            manifest_text = self._read_plugin_file(os.path.join(plugin_path, "_manifest.json"))
+            if manifest_text is not None:
+                usage_info["manifest"] = json.loads(manifest_text)
                 logger.debug(f"成功读取插件 {plugin_name} 的 _manifest.json")
-            except Exception as e:
-                logger.warning(f"读取 _manifest.json 失败: {e}")
+        except Exception as e:
+            logger.warning(f"读取 _manifest.json 失败: {e}")
 
         # 从组件中提取命令和工具信息
         plugin_data = self.component_registry._plugins.get(plugin_name)
         if plugin_data:
             for component in plugin_data.components:
-                comp_info = {
+                category = _usage_category(component.component_type)
+                if category is None:
+                    continue
+
+                usage_info[category].append({
                     "name": component.name,
                     "description": component.description if hasattr(component, "description") else "",
                     "enabled": component.enabled,
-                }
-
-                comp_type = str(component.component_type).lower()
-                if "command" in comp_type:
-                    usage_info["commands"].append(comp_info)
-                elif "tool" in comp_type:
-                    usage_info["tools"].append(comp_info)
-                elif "event" in comp_type:
-                    usage_info["event_handlers"].append(comp_info)
+                })
 
         return usage_info
+
+    def _read_plugin_file(self, path: str) -> Optional[str]:
+        """
+        读取插件目录下的文本文件，文件修改时间不变时直接返回缓存的内容
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            文件内容，文件不存在时返回None
+        """
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        cached = self._file_cache.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        self._file_cache[path] = (mtime_ns, content)
+        return content
@@ -6,12 +6,25 @@
 import time
 import re
 from typing import Dict, Optional, Any, List
-from dataclasses import dataclass, asdict
-from collections import defaultdict, Counter
+from dataclasses import dataclass
+from collections import defaultdict, deque, Counter
 from src.common.logger import get_logger
 
+try:
+    import ahocorasick
+
+    _HAS_AHOCORASICK = True
+except ImportError:  # pyahocorasick 为可选依赖，缺失时回退到逐词 in 判断
+    _HAS_AHOCORASICK = False
+
 logger = get_logger("security_perception")
 
+# 预编译的正则表达式
+_REPEAT_CHAR_RE = re.compile(r'(.)\1{5,}')  # 同一字符连续出现6次及以上
+_EMOJI_RE = re.compile(r'[\U0001F600-\U0001F64F]')  # 😀-🙏
+_MONEY_RE = re.compile(r'[0-9,]+元|￥[0-9,]+|[0-9]+块钱')
+_URL_RE = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+
 
 @dataclass
 class SecurityStatus:
@@ -53,8 +66,23 @@ class SecurityStatus:
             self.abnormal_patterns = []
 
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return asdict(self)
+        """转换为字典（浅拷贝，列表字段直接引用，调用方不应修改）"""
+        return {
+            "chat_id": self.chat_id,
+            "user_id": self.user_id,
+            "risk_level": self.risk_level,
+            "risk_score": self.risk_score,
+            "has_sensitive_content": self.has_sensitive_content,
+            "has_spam": self.has_spam,
+            "has_malicious_link": self.has_malicious_link,
+            "has_abnormal_behavior": self.has_abnormal_behavior,
+            "detected_issues": self.detected_issues,
+            "sensitive_keywords": self.sensitive_keywords,
+            "spam_indicators": self.spam_indicators,
+            "abnormal_patterns": self.abnormal_patterns,
+            "suspicious_activity": self.suspicious_activity,
+            "timestamp": self.timestamp,
+        }
 
     def get_human_readable_summary(self) -> str:
         """获取人类可读的安全状态摘要"""
@@ -77,6 +105,20 @@ class SecurityStatus:
         return "，".join(parts)
 
 
+def _tail(items: deque, n: int) -> List:
+    """取 deque 末尾 n 个元素（保持原顺序），只访问两端附近的元素"""
+    return [items[i] for i in range(-min(n, len(items)), 0)]
+
+
+def _counter_decrement(counter: Counter, item: str):
+    """计数减一，归零时删除键"""
+    count = counter[item] - 1
+    if count > 0:
+        counter[item] = count
+    else:
+        del counter[item]
+
+
 class SecurityPerception:
     """安全感知器"""
 
@@ -100,6 +142,9 @@ class SecurityPerception:
         r'[0-9]{6,}',  # 长数字串
     ]
 
+    # SPAM_PATTERNS 命中时必然出现的字符（各模式开头的必需字符），修改模式时需同步更新并补充测试示例
+    SPAM_TRIGGER_CHARS = "加免限点复0123456789"
+
     # 可疑链接模式
     SUSPICIOUS_URL_PATTERNS = [
         r'bit\.ly',
@@ -113,6 +158,9 @@ class SecurityPerception:
         "验证码", "银行卡", "身份证", "紧急", "立即",
     }
 
+    # 紧急性用词
+    URGENT_WORDS = ["马上", "立即", "赶快", "限时", "紧急"]
+
     def __init__(self, sensitivity: str = "medium"):
         """
         初始化安全感知器
@@ -123,9 +171,10 @@ class SecurityPerception:
         self.sensitivity = sensitivity
 
         # 用户行为历史（用于异常检测）
-        # {user_id: {"message_times": [], "message_contents": []}}
-        self.user_history: Dict[str, Dict[str, List]] = defaultdict(
-            lambda: {"message_times": [], "message_contents": []}
+        # {user_id: {"message_times": deque, "message_contents": deque, "recent_counter": Counter}}
+        # 消息按时间顺序排列，recent_counter 为最近10条消息内容的计数
+        self.user_history: Dict[str, Dict[str, Any]] = defaultdict(
+            lambda: {"message_times": deque(), "message_contents": deque(), "recent_counter": Counter()}
         )
 
         # 敏感度阈值
@@ -135,6 +184,29 @@ class SecurityPerception:
             "high": {"spam_score": 40, "fraud_score": 50},
         }
 
+        # 敏感词与欺诈关键词合并为一张表：(关键词, 是否敏感词, 是否欺诈关键词)
+        keywords = list(self.SENSITIVE_KEYWORDS) + [k for k in self.FRAUD_KEYWORDS if k not in self.SENSITIVE_KEYWORDS]
+        self._keyword_table = tuple(
+            (keyword, keyword in self.SENSITIVE_KEYWORDS, keyword in self.FRAUD_KEYWORDS) for keyword in keywords
+        )
+        self._keyword_automaton = self._build_keyword_automaton() if _HAS_AHOCORASICK else None
+        # 合并正则预筛：不含任何关键词的消息一次扫描即可跳过逐词判断
+        self._keyword_pattern = re.compile("|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)))
+
+        # 垃圾信息模式逐个预编译：各模式首字符集合不同，合并成一个正则后引擎无法按首字符快速跳过，
+        # 实测在不命中的长消息上反而更慢
+        self._spam_patterns = tuple(
+            (re.compile(pattern), f"匹配模式: {pattern[:20]}") for pattern in self.SPAM_PATTERNS
+        )
+        self._suspicious_url_pattern = re.compile("|".join(f"(?:{pattern})" for pattern in self.SUSPICIOUS_URL_PATTERNS))
+
+        # 触发字符：关键词、垃圾信息模式、金额（数字、逗号、￥）、紧急用词和链接（http）各自必需的字符。
+        # 消息不含其中任何字符时这几项检测必然为阴性，可整体跳过；字符集正则扫描比逐项检测便宜得多
+        trigger_chars = set(self.SPAM_TRIGGER_CHARS) | set("0123456789,￥h")
+        trigger_chars.update(keyword[0] for keyword, _, _ in self._keyword_table)
+        trigger_chars.update(word[0] for word in self.URGENT_WORDS)
+        self._trigger_pattern = re.compile("[" + "".join(re.escape(c) for c in sorted(trigger_chars)) + "]")
+
         logger.info(f"安全感知模块初始化完成，敏感度: {sensitivity}")
 
     def analyze_message(
@@ -160,15 +232,23 @@ class SecurityPerception:
             timestamp = time.time()
 
         # 记录历史
-        self.user_history[user_id]["message_times"].append(timestamp)
-        self.user_history[user_id]["message_contents"].append(message_content)
-
-        # 清理旧数据（保留7天）
-        cutoff = timestamp - (7 * 86400)
         history = self.user_history[user_id]
-        valid_indices = [i for i, t in enumerate(history["message_times"]) if t >= cutoff]
-        history["message_times"] = [history["message_times"][i] for i in valid_indices]
-        history["message_contents"] = [history["message_contents"][i] for i in valid_indices]
+        message_times = history["message_times"]
+        message_contents = history["message_contents"]
+        recent_counter = history["recent_counter"]
+        message_times.append(timestamp)
+        message_contents.append(message_content)
+        recent_counter[message_content] += 1
+        if len(message_contents) > 10:
+            _counter_decrement(recent_counter, message_contents[-11])
+
+        # 清理旧数据（保留7天），消息按时间顺序追加，过期消息只会出现在队首
+        cutoff = timestamp - (7 * 86400)
+        while message_times[0] < cutoff:
+            message_times.popleft()
+            expired = message_contents.popleft()
+            if len(message_contents) < 10:  # 过期消息仍在最近10条内
+                _counter_decrement(recent_counter, expired)
 
         # 执行各项检测
         detected_issues = []
@@ -176,20 +256,29 @@ class SecurityPerception:
         spam_indicators = []
         abnormal_patterns = []
 
+        # 不含任何触发字符的消息跳过关键词、垃圾信息模式、链接和欺诈检测
+        needs_content_checks = self._trigger_pattern.search(message_content) is not None
+
+        # 敏感词和欺诈关键词一次扫描完成
+        if needs_content_checks:
+            keywords, fraud_keyword_count = self._match_keywords(message_content)
+        else:
+            keywords, fraud_keyword_count = [], 0
+
         # 1. 敏感内容检测
-        has_sensitive, keywords = self._detect_sensitive_content(message_content)
+        has_sensitive = len(keywords) > 0
         if has_sensitive:
             detected_issues.append("包含敏感内容")
             sensitive_keywords = keywords
 
         # 2. 垃圾信息检测
-        is_spam, indicators = self._detect_spam(message_content)
+        is_spam, indicators = self._detect_spam(message_content, needs_content_checks)
         if is_spam:
             detected_issues.append("疑似垃圾信息")
             spam_indicators = indicators
 
         # 3. 恶意链接检测
-        has_malicious_link = self._detect_malicious_links(message_content)
+        has_malicious_link = needs_content_checks and self._detect_malicious_links(message_content)
         if has_malicious_link:
             detected_issues.append("包含可疑链接")
 
@@ -200,7 +289,7 @@ class SecurityPerception:
             abnormal_patterns = patterns
 
         # 5. 欺诈检测
-        fraud_score = self._detect_fraud(message_content)
+        fraud_score = self._detect_fraud(message_content, fraud_keyword_count) if needs_content_checks else 0.0
         if fraud_score > self.thresholds[self.sensitivity]["fraud_score"]:
             detected_issues.append("疑似诈骗信息")
 
@@ -227,27 +316,58 @@ class SecurityPerception:
             timestamp=timestamp,
         )
 
-    def _detect_sensitive_content(self, message: str) -> tuple[bool, List[str]]:
-        """检测敏感内容"""
-        found_keywords = []
+    def _build_keyword_automaton(self):
+        """构建敏感词和欺诈关键词的 Aho-Corasick 自动机，一次扫描即可找出消息中的全部关键词"""
+        automaton = ahocorasick.Automaton()
+        for entry in self._keyword_table:
+            automaton.add_word(entry[0], entry)
+        automaton.make_automaton()
+        return automaton
 
-        for keyword in self.SENSITIVE_KEYWORDS:
-            if keyword in message:
-                found_keywords.append(keyword)
+    def _match_keywords(self, message: str) -> tuple[List[str], int]:
+        """
+        匹配敏感词和欺诈关键词（同一关键词在一条消息中只计一次）
 
-        return len(found_keywords) > 0, found_keywords
+        Returns:
+            (命中的敏感词列表, 命中的欺诈关键词个数)
+        """
+        sensitive_keywords = []
+        fraud_count = 0
+        automaton = self._keyword_automaton
+        if automaton is not None:
+            seen = set()
+            for _, (keyword, is_sensitive, is_fraud) in automaton.iter(message):
+                if keyword not in seen:
+                    seen.add(keyword)
+                    if is_sensitive:
+                        sensitive_keywords.append(keyword)
+                    fraud_count += is_fraud
+        elif self._keyword_pattern.search(message) is not None:
+            for keyword, is_sensitive, is_fraud in self._keyword_table:
+                if keyword in message:
+                    if is_sensitive:
+                        sensitive_keywords.append(keyword)
+                    fraud_count += is_fraud
+        return sensitive_keywords, fraud_count
+
+    def _detect_spam(self, message: str, check_patterns: bool = True) -> tuple[bool, List[str]]:
+        """
+        检测垃圾信息
 
-    def _detect_spam(self, message: str) -> tuple[bool, List[str]]:
-        """检测垃圾信息"""
+        Args:
+            message: 消息内容
+            check_patterns: 是否检测 SPAM_PATTERNS（消息不含触发字符时可跳过）
+        """
         indicators = []
 
         # 检测模式
-        for pattern in self.SPAM_PATTERNS:
-            if re.search(pattern, message):
-                indicators.append(f"匹配模式: {pattern[:20]}")
+        if check_patterns:
+            for pattern, indicator in self._spam_patterns:
+                if pattern.search(message) is not None:
+                    indicators.append(indicator)
 
         # 检测重复字符
-        if re.search(r'(.)\1{5,}', message):
+        if _REPEAT_CHAR_RE.search(message) is not None:
             indicators.append("大量重复字符")
 
         # 检测全大写
@@ -255,9 +375,14 @@ class SecurityPerception:
             indicators.append("全大写文本")
 
         # 检测过多表情
-        emoji_count = len(re.findall(r'[😀-🙏]', message))
-        if emoji_count > 10:
-            indicators.append("过多表情符号")
+        # 纯 ASCII 消息不可能含表情；逐个计数，超过阈值即停止
+        if not message.isascii():
+            emoji_count = 0
+            for _ in _EMOJI_RE.finditer(message):
+                emoji_count += 1
+                if emoji_count > 10:
+                    indicators.append("过多表情符号")
+                    break
 
         spam_score = len(indicators) * 25  # 每个指标25分
 
@@ -266,12 +391,13 @@ class SecurityPerception:
     def _detect_malicious_links(self, message: str) -> bool:
         """检测恶意链接"""
         # 检测URL
-        urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', message)
+        if "http" not in message:
+            return False
 
-        for url in urls:
-            for pattern in self.SUSPICIOUS_URL_PATTERNS:
-                if re.search(pattern, url):
-                    return True
+        suspicious_url_pattern = self._suspicious_url_pattern
+        for match in _URL_RE.finditer(message):
+            if suspicious_url_pattern.search(match.group()) is not None:
+                return True
 
         return False
 
@@ -281,47 +407,49 @@ class SecurityPerception:
         """检测异常行为"""
         abnormal_patterns = []
         history = self.user_history[user_id]
-
-        # 1. 短时间内大量发送
-        recent_times = [t for t in history["message_times"] if timestamp - t < 60]
-        if len(recent_times) > 10:
+        message_times = history["message_times"]
+
+        # 1. 短时间内大量发送（从队尾向前数，遇到60秒以前的消息即停止）
+        recent_count = 0
+        for t in reversed(message_times):
+            if timestamp - t >= 60:
+                break
+            recent_count += 1
+        if recent_count > 10:
             abnormal_patterns.append("短时间内频繁发送消息")
 
-        # 2. 重复内容
-        recent_contents = history["message_contents"][-10:]
-        if message in recent_contents[:-1]:  # 排除当前消息
-            duplicate_count = recent_contents.count(message)
-            if duplicate_count > 2:
-                abnormal_patterns.append("发送重复内容")
+        # 2. 重复内容（最近10条中出现超过2次，含当前消息）
+        if history["recent_counter"][message] > 2:
+            abnormal_patterns.append("发送重复内容")
 
         # 3. 消息长度异常
         if len(message) > 1000:
             abnormal_patterns.append("消息长度异常")
 
         # 4. 突然改变发言模式（从不发言到大量发言）
-        if len(recent_times) > 5 and len(history["message_times"]) > 10:
-            older_activity = len([t for t in history["message_times"] if timestamp - t > 3600])
+        if recent_count > 5 and len(message_times) > 10:
+            # 一小时前的消息位于队首，只需数到5条即可判断
+            older_activity = 0
+            for t in message_times:
+                if timestamp - t <= 3600 or older_activity >= 5:
+                    break
+                older_activity += 1
             if older_activity < 5:  # 之前不活跃
                 abnormal_patterns.append("发言模式突变")
 
         return len(abnormal_patterns) > 0, abnormal_patterns
 
-    def _detect_fraud(self, message: str) -> float:
+    def _detect_fraud(self, message: str, fraud_keyword_count: int) -> float:
         """检测欺诈（返回分数0-100）"""
-        fraud_score = 0.0
-
-        # 检测欺诈关键词
-        for keyword in self.FRAUD_KEYWORDS:
-            if keyword in message:
-                fraud_score += 15
+        # 欺诈关键词（由 _match_keywords 统计）
+        fraud_score = 15.0 * fraud_keyword_count
 
         # 检测金额相关
-        if re.search(r'[0-9,]+元|￥[0-9,]+|[0-9]+块钱', message):
+        if _MONEY_RE.search(message) is not None:
             fraud_score += 20
 
         # 检测紧急性用词
-        urgent_words = ["马上", "立即", "赶快", "限时", "紧急"]
-        if any(word in message for word in urgent_words):
+        if any(word in message for word in self.URGENT_WORDS):
             fraud_score += 10
 
         return min(100.0, fraud_score)
@@ -373,9 +501,9 @@ class SecurityPerception:
         Returns:
             安全摘要字典
         """
-        history = self.user_history.get(user_id, {"message_times": [], "message_contents": []})
+        history = self.user_history.get(user_id)
 
-        total_messages = len(history["message_contents"])
+        total_messages = len(history["message_contents"]) if history else 0
         if total_messages == 0:
             return {
                 "user_id": user_id,
@@ -384,8 +512,8 @@ class SecurityPerception:
                 "is_trustworthy": True,
             }
 
-        # 分析最近消息的风险
-        recent_messages = history["message_contents"][-20:]
+        # 分析最近消息的风险（风险分数只是几次加法和比较，开销集中在逐条检测上）
+        recent_messages = _tail(history["message_contents"], 20)
         risk_count = 0
 
         for msg in recent_messages:
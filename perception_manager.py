@@ -3,6 +3,7 @@
 统一管理和调度所有感知子模块
 """
 
+import atexit
 import time
 import asyncio
 from typing import Dict, Optional, Any, List
@@ -203,6 +204,9 @@ class PerceptionManager:
         self.perception_cache: OrderedDict[str, PerceptionSnapshot] = OrderedDict()
         self.cache_ttl: float = 60.0  # 缓存有效期（秒）
         self.cache_max_size: int = 100  # 最大缓存数量（LRU淘汰）
+        # 缓存反向索引：chat_id -> {cache_key: 快照涉及的用户集合（None 表示 'all'）}
+        self._chat_cache_keys: Dict[Optional[str], Dict[str, Optional[frozenset]]] = {}
+        self._cache_key_chat: Dict[str, Optional[str]] = {}
 
         # 批量处理和防抖
         self.message_buffer: deque = deque(maxlen=50)  # 消息缓冲区
@@ -265,6 +269,10 @@ class PerceptionManager:
         if "enabled_modules" in config:
             self.enabled_modules.update(config["enabled_modules"])
 
+        # 设备感知配置
+        if "device" in config:
+            self.device_perception.set_sample_interval(config["device"].get("cpu_sample_interval", 2.0))
+
         # 环境感知配置
         if "environment" in config and self.enabled_modules.get("environment"):
             env_config = config["environment"]
@@ -277,8 +285,12 @@ class PerceptionManager:
         # 行为模式感知配置
         if "behavior_pattern" in config and self.enabled_modules.get("behavior_pattern"):
             bp_config = config["behavior_pattern"]
+            # 先停止旧实例的后台保存线程并落盘，避免两个线程写同一个缓存文件
+            if self.behavior_perception is not None:
+                self.behavior_perception.stop_cache_saver()
             self.behavior_perception = BehaviorPatternPerception(
-                history_days=bp_config.get("history_days", 30)
+                history_days=bp_config.get("history_days", 30),
+                cache_file=bp_config.get("cache_file", ""),
             )
 
         # 社交网络感知配置
@@ -311,6 +323,27 @@ class PerceptionManager:
 
         logger.info(f"感知管理器配置完成，启用模块: {self.enabled_modules}")
 
+    def shutdown(self):
+        """关闭感知管理器：停止后台任务，并保存需要持久化的数据（可重复调用）"""
+        try:
+            if self._flush_task and not self._flush_task.done():
+                self._flush_task.cancel()
+        except Exception as e:
+            logger.error(f"取消自动刷新任务失败: {e}")
+
+        try:
+            if self.behavior_perception:
+                self.behavior_perception.stop_cache_saver()
+        except Exception as e:
+            logger.error(f"保存行为模式缓存失败: {e}")
+
+        try:
+            self.device_perception.stop_sampling()
+        except Exception as e:
+            logger.error(f"停止设备采样失败: {e}")
+
+        logger.info("感知管理器已关闭")
+
     def _start_auto_flush(self):
         """启动自动刷新任务"""
         try:
@@ -410,45 +443,21 @@ class PerceptionManager:
         优化策略：
         1. 只失效包含特定用户的快照缓存
         2. 不失效不包含该用户的其他快照
-        3. 使用精确匹配而非模糊匹配
+        3. 通过 chat_id 反向索引直接定位候选条目，无需遍历整个缓存
 
         Args:
             chat_id: 聊天ID
             user_id: 用户ID
         """
-        keys_to_remove = []
-
-        # 遍历缓存，精确匹配需要失效的条目
-        for key in list(self.perception_cache.keys()):
-            # 解析缓存key格式: "{chat_id}_{user_ids}"
-            parts = key.split('_', 1)
-            if len(parts) != 2:
-                continue
-
-            key_chat_id = parts[0]
-            key_user_ids = parts[1]
-
-            # 只有满足以下条件才失效:
-            # 1. chat_id匹配
-            # 2. user_ids包含当前用户或为'all'
-            should_invalidate = False
-
-            if key_chat_id == chat_id:
-                if key_user_ids == 'all':
-                    # 'all'缓存在有新消息时总是失效
-                    should_invalidate = True
-                elif user_id in key_user_ids.split(','):
-                    # 精确匹配用户ID（避免'123'匹配'1234'的问题）
-                    user_list = key_user_ids.split(',')
-                    if user_id in user_list:
-                        should_invalidate = True
-
-            if should_invalidate:
-                keys_to_remove.append(key)
-
-        # 批量删除（减少字典操作次数）
+        entries = self._chat_cache_keys.get(chat_id)
+        if not entries:
+            return
+
+        # 'all'缓存在有新消息时总是失效，其余只失效包含当前用户的快照
+        keys_to_remove = [key for key, users in entries.items() if users is None or user_id in users]
+
         for key in keys_to_remove:
-            del self.perception_cache[key]
+            self._remove_cache_entry(key)
 
         # 记录统计信息
         if keys_to_remove:
@@ -456,6 +465,27 @@ class PerceptionManager:
             self.stats.setdefault("cache_invalidations", 0)
             self.stats["cache_invalidations"] += len(keys_to_remove)
 
+    def _add_cache_entry(
+        self, cache_key: str, chat_id: Optional[str], user_ids: Optional[List[str]], snapshot: PerceptionSnapshot
+    ):
+        """写入快照缓存并登记反向索引"""
+        self.perception_cache[cache_key] = snapshot
+        self._cache_key_chat[cache_key] = chat_id
+        self._chat_cache_keys.setdefault(chat_id, {})[cache_key] = frozenset(user_ids) if user_ids else None
+
+    def _remove_cache_entry(self, cache_key: str):
+        """删除快照缓存并同步清理反向索引"""
+        self.perception_cache.pop(cache_key, None)
+        if cache_key not in self._cache_key_chat:
+            return
+
+        chat_id = self._cache_key_chat.pop(cache_key)
+        entries = self._chat_cache_keys.get(chat_id)
+        if entries is not None:
+            entries.pop(cache_key, None)
+            if not entries:
+                del self._chat_cache_keys[chat_id]
+
     def record_user_message(
         self,
         chat_id: str,
@@ -707,7 +737,7 @@ class PerceptionManager:
                 return cached
             else:
                 # 缓存过期，删除
-                del self.perception_cache[cache_key]
+                self._remove_cache_entry(cache_key)
 
         self.stats["cache_misses"] += 1
 
@@ -779,10 +809,10 @@ class PerceptionManager:
             if len(self.perception_cache) >= self.cache_max_size:
                 # 移除最早的缓存项（FIFO/LRU）
                 oldest_key = next(iter(self.perception_cache))
-                del self.perception_cache[oldest_key]
+                self._remove_cache_entry(oldest_key)
                 logger.debug(f"缓存已满，淘汰最旧项: {oldest_key}")
 
-            self.perception_cache[cache_key] = snapshot
+            self._add_cache_entry(cache_key, chat_id, user_ids, snapshot)
 
         return snapshot
 
@@ -1014,6 +1044,8 @@ class PerceptionManager:
     def clear_cache(self):
         """清除缓存"""
         self.perception_cache.clear()
+        self._chat_cache_keys.clear()
+        self._cache_key_chat.clear()
         logger.info("感知缓存已清除")
 
     def get_perception_summary(
@@ -1076,3 +1108,5 @@ class PerceptionManager:
 
 # 全局单例
 perception_manager = PerceptionManager()
+# 宿主未触发停止事件时，进程退出前兜底执行一次关闭（只为全局单例注册）
+atexit.register(perception_manager.shutdown)
@@ -78,6 +78,9 @@ class PerceptionMessageHandler(BaseEventHandler):
                     "security": self.get_config("perception.security.enabled", True),
                     "plugin_status": self.get_config("perception.plugin_status.enabled", True),
                 },
+                "device": {
+                    "cpu_sample_interval": self.get_config("perception.device.cpu_sample_interval", 2.0),
+                },
                 "environment": {
                     "enable_weather": self.get_config("perception.environment.enable_weather", False),
                     "weather_api_key": self.get_config("perception.environment.weather_api_key", ""),
@@ -85,6 +88,7 @@ class PerceptionMessageHandler(BaseEventHandler):
                 },
                 "behavior_pattern": {
                     "history_days": self.get_config("perception.behavior_pattern.history_days", 30),
+                    "cache_file": self.get_config("perception.behavior_pattern.cache_file", ""),
                 },
                 "social_network": {
                     "interaction_threshold_days": self.get_config("perception.social_network.interaction_threshold_days", 7),
@@ -185,6 +189,26 @@ class PerceptionLLMHandler(BaseEventHandler):
             return True, True, None, None, None
 
 
+class PerceptionStopHandler(BaseEventHandler):
+    """感知停止处理器 - 关闭时停止后台任务并保存持久化数据"""
+
+    event_type = EventType.ON_STOP
+    handler_name = "perception_stop_handler"
+    handler_description = "关闭时停止感知后台任务并保存行为模式缓存"
+    weight = 5
+    intercept_message = False
+
+    async def execute(
+        self, message: MaiMessages | None
+    ) -> Tuple[bool, bool, Optional[str], Optional[CustomEventHandlerResult], Optional[MaiMessages]]:
+        """处理停止事件"""
+        try:
+            perception_manager.shutdown()
+        except Exception as e:
+            logger.error(f"感知模块关闭失败: {e}", exc_info=True)
+        return True, True, None, None, None
+
+
 # ===== 工具 =====
 
 class GetPerceptionTool(BaseTool):
@@ -730,6 +754,7 @@ class PerceptionPlugin(BasePlugin):
         "perception": {
             "device": {
                 "enabled": ConfigField(type=bool, default=True, description="是否启用设备感知"),
+                "cpu_sample_interval": ConfigField(type=float, default=2.0, description="CPU后台采样基础间隔（秒）"),
             },
             "environment": {
                 "enabled": ConfigField(type=bool, default=False, description="是否启用环境感知"),
@@ -750,6 +775,7 @@ class PerceptionPlugin(BasePlugin):
             "behavior_pattern": {
                 "enabled": ConfigField(type=bool, default=True, description="是否启用行为模式感知"),
                 "history_days": ConfigField(type=int, default=30, description="历史分析天数"),
+                "cache_file": ConfigField(type=str, default="", description="行为模式缓存持久化文件路径（留空不持久化）"),
             },
             "social_network": {
                 "enabled": ConfigField(type=bool, default=True, description="是否启用社交网络感知"),
@@ -780,6 +806,7 @@ class PerceptionPlugin(BasePlugin):
             # 事件处理器
             (PerceptionMessageHandler.get_handler_info(), PerceptionMessageHandler),
             (PerceptionLLMHandler.get_handler_info(), PerceptionLLMHandler),
+            (PerceptionStopHandler.get_handler_info(), PerceptionStopHandler),
             # 基础感知工具
             (GetPerceptionTool.get_tool_info(), GetPerceptionTool),
             (GetDeviceStatusTool.get_tool_info(), GetDeviceStatusTool),
@@ -7,8 +7,10 @@
 """
 
 import asyncio
+import random
 import sys
 import os
+import time
 
 # 添加项目路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
@@ -123,6 +125,371 @@ async def test_tiered_cache():
     print("优化点: 根据访问频率自动调整缓存层级")
 
 
+async def test_hour_weekday_parity():
+    """测试整数运算的小时/星期计算与 datetime 结果一致"""
+    from datetime import datetime
+    from plugins.perception_plugin.core.behavior_pattern_perception import _hour_weekday
+
+    print("\n" + "=" * 60)
+    print("测试 4: 小时/星期整数计算")
+    print("=" * 60)
+
+    # 参考时间戳：纪元附近、整点/跨日边界、闰年、当前时间附近
+    now = int(time.time())
+    reference = [0, 1, 3599, 3600, 86399, 86400, 951782400, 1709164800.5, 1735689599.999]
+    reference += [now + k * 1801 for k in range(-500, 500)]
+
+    mismatches = 0
+    for ts in reference:
+        dt = datetime.fromtimestamp(ts)
+        if _hour_weekday(ts) != (dt.hour, dt.weekday()):
+            mismatches += 1
+            print(f"不一致: {ts} -> {_hour_weekday(ts)} != {(dt.hour, dt.weekday())}")
+
+    assert mismatches == 0, "小时/星期计算与 datetime 不一致"
+
+    print("\n✅ 小时/星期计算一致性测试完成")
+
+
+async def test_security_trigger_chars():
+    """测试安全检测的触发字符预筛不会漏掉任何应检测的消息"""
+    from plugins.perception_plugin.core.security_perception import (
+        SecurityPerception,
+        _MONEY_RE,
+        _URL_RE,
+    )
+
+    print("\n" + "=" * 60)
+    print("测试 5: 安全检测触发字符")
+    print("=" * 60)
+
+    security = SecurityPerception()
+    trigger = security._trigger_pattern
+
+    # 每个垃圾信息模式的示例（顺序与 SPAM_PATTERNS 一致，新增模式时需补充示例）
+    spam_examples = [
+        ["加我微信", "添加QQ好友", "加一下vx"],
+        ["免费领取", "限时获得大礼", "免费送，快来领取"],
+        ["点击链接", "复制网址到浏览器", "点击下方的链接"],
+        ["123456", "订单号0000000"],
+    ]
+    assert len(spam_examples) == len(security.SPAM_PATTERNS), "SPAM_PATTERNS 有模式缺少示例"
+
+    checks = []
+    for (pattern, _), examples in zip(security._spam_patterns, spam_examples):
+        checks += [(pattern, example) for example in examples]
+    checks += [(_MONEY_RE, example) for example in ["100元", "1,000元", "￥50", "￥1,000", "20块钱", ",元"]]
+    checks += [(_URL_RE, example) for example in ["http://bit.ly/abc", "https://t.cn/xyz", "见 https://a.com"]]
+
+    missed = 0
+    for pattern, example in checks:
+        assert pattern.search(example) is not None, f"示例未命中其模式: {example}"
+        if trigger.search(example) is None:
+            missed += 1
+            print(f"触发字符漏检: {example}")
+
+    # 关键词和紧急用词本身必须包含触发字符
+    words = [keyword for keyword, _, _ in security._keyword_table] + list(security.URGENT_WORDS)
+    for word in words:
+        if trigger.search(word) is None:
+            missed += 1
+            print(f"触发字符漏检: {word}")
+
+    assert missed == 0, "触发字符未覆盖所有检测模式"
+
+    print("\n✅ 安全检测触发字符测试完成")
+
+
+async def test_language_stats_parity():
+    """测试语言风格增量统计与按窗口内消息重新汇总的结果一致"""
+    from plugins.perception_plugin.core.language_style_perception import LanguageStats, LanguageStylePerception
+
+    print("\n" + "=" * 60)
+    print("测试 6: 语言风格增量统计")
+    print("=" * 60)
+
+    rng = random.Random(0)
+    samples = [
+        "你好，今天天气不错！", "哈哈哈笑死我了", "请问这个怎么用？", "谢谢大家，再见",
+        "嗯嗯好的 (^_^)", "根据相关规定，需要进一步确认。", "早上好～", "yyds 绝绝子", "拜拜",
+    ]
+    perception = LanguageStylePerception(history_window=1)
+    now = time.time()
+    mismatches = 0
+    for i in range(400):
+        # 约三分之一的消息落在窗口之外，随后续记录逐批过期
+        timestamp = now - rng.choice([0, 3600, 2 * 86400]) + i
+        perception.record_message(f"user_{i % 3}", rng.choice(samples), timestamp)
+
+        for user_id, records in perception.user_messages.items():
+            expected = LanguageStats()
+            for record in records:
+                expected.add(perception._extract_features(record.content))
+            if perception.user_stats[user_id] != expected:
+                mismatches += 1
+
+    assert mismatches == 0, "增量统计与重新汇总结果不一致"
+
+    print("\n✅ 语言风格增量统计测试完成")
+
+
+async def test_security_recent_counter_parity():
+    """测试安全检测最近10条消息计数与直接统计的结果一致"""
+    from collections import Counter
+    from plugins.perception_plugin.core.security_perception import SecurityPerception
+
+    print("\n" + "=" * 60)
+    print("测试 7: 最近消息计数")
+    print("=" * 60)
+
+    rng = random.Random(1)
+    security = SecurityPerception()
+    timestamp = time.time()
+    mismatches = 0
+    for _ in range(2000):
+        # 偶尔跳过7天以上，使队首消息过期（包括仍在最近10条内的消息）
+        timestamp += rng.choice([1, 1, 5, 60, 8 * 86400])
+        user_id = rng.choice(["user_a", "user_b"])
+        security.analyze_message("chat", user_id, rng.choice(["在吗", "你好", "hello", "1", "2"]), timestamp)
+
+        history = security.user_history[user_id]
+        if history["recent_counter"] != Counter(list(history["message_contents"])[-10:]):
+            mismatches += 1
+
+    assert mismatches == 0, "最近消息计数与直接统计不一致"
+
+    print("\n✅ 最近消息计数测试完成")
+
+
+async def test_snapshot_cache_index():
+    """测试快照缓存反向索引的失效结果与逐条判断一致"""
+    from plugins.perception_plugin.perception_manager import PerceptionSnapshot
+
+    print("\n" + "=" * 60)
+    print("测试 8: 快照缓存反向索引")
+    print("=" * 60)
+
+    rng = random.Random(2)
+    manager = perception_manager
+    manager.clear_cache()
+    chats = ["chat_1", "chat_2", "c3", None]
+    users = ["u1", "u2", "u_3", "u4"]
+
+    # 参考模型：cache_key -> (chat_id, 用户集合或 None)
+    expected = {}
+    mismatches = 0
+    for _ in range(3000):
+        op = rng.random()
+        if op < 0.5:
+            chat_id = rng.choice(chats)
+            user_ids = rng.sample(users, rng.randint(0, 3)) or None
+            cache_key = f"{chat_id}_{','.join(user_ids) if user_ids else 'all'}"
+            manager._remove_cache_entry(cache_key)
+            manager._add_cache_entry(cache_key, chat_id, user_ids, PerceptionSnapshot(timestamp=time.time()))
+            expected[cache_key] = (chat_id, frozenset(user_ids) if user_ids else None)
+        elif op < 0.9:
+            chat_id, user_id = rng.choice(chats), rng.choice(users)
+            manager._invalidate_related_cache(chat_id, user_id)
+            expected = {
+                key: (key_chat, key_users)
+                for key, (key_chat, key_users) in expected.items()
+                if not (key_chat == chat_id and (key_users is None or user_id in key_users))
+            }
+        elif expected:
+            cache_key = rng.choice(list(expected))
+            manager._remove_cache_entry(cache_key)
+            del expected[cache_key]
+
+        indexed = {key for entries in manager._chat_cache_keys.values() for key in entries}
+        if set(manager.perception_cache) != set(expected) or indexed != set(expected):
+            mismatches += 1
+
+    manager.clear_cache()
+    assert mismatches == 0, "反向索引失效结果与逐条判断不一致"
+
+    print("\n✅ 快照缓存反向索引测试完成")
+
+
+async def test_behavior_pattern_cache():
+    """测试行为模式缓存在新消息和过期清理后与重新计算的结果一致"""
+    from plugins.perception_plugin.core.behavior_pattern_perception import BehaviorPatternPerception
+
+    print("\n" + "=" * 60)
+    print("测试 9: 行为模式缓存失效")
+    print("=" * 60)
+
+    rng = random.Random(3)
+    cached = BehaviorPatternPerception(history_days=7)
+    recorded = []
+    # 消息按时间顺序到达，从10天前开始，早于7天窗口的消息在分析时被清理
+    timestamp = time.time() - 10 * 86400
+    mismatches = 0
+    for _ in range(600):
+        if rng.random() < 0.7:
+            message = (rng.choice(["u1", "u2"]), rng.choice(["游戏 原神", "学习 考试", "吃饭"]), rng.choice(["c1", "c2"]))
+            timestamp += rng.choice([60, 600, 3600])
+            cached.record_message(*message, timestamp)
+            recorded.append((*message, timestamp))
+            continue
+
+        user_id = rng.choice(["u1", "u2", "u3"])
+        pattern = cached.get_behavior_pattern(user_id, "昵称")
+        # 调用方修改返回结果不应影响缓存
+        pattern.hourly_activity.clear()
+        pattern.favorite_topics.append("篡改")
+
+        fresh = BehaviorPatternPerception(history_days=7)
+        for message in recorded:
+            fresh.record_message(*message)
+        actual = cached.get_behavior_pattern(user_id, "昵称").to_dict()
+        reference = fresh.get_behavior_pattern(user_id, "昵称").to_dict()
+        actual.pop("timestamp")
+        reference.pop("timestamp")
+        if actual != reference:
+            mismatches += 1
+
+    assert mismatches == 0, "行为模式缓存结果与重新计算不一致"
+
+    print("\n✅ 行为模式缓存失效测试完成")
+
+
+async def test_plugin_status_cache():
+    """测试插件系统状态缓存在插件/组件启用状态变化后失效"""
+    from types import SimpleNamespace
+    from plugins.perception_plugin.core.plugin_status_perception import PluginStatusPerception
+
+    print("\n" + "=" * 60)
+    print("测试 10: 插件状态缓存失效")
+    print("=" * 60)
+
+    rng = random.Random(4)
+    plugins = {}
+    for i in range(6):
+        components = [
+            SimpleNamespace(name=f"c{j}", component_type=rng.choice(["command", "tool", "event_handler"]), enabled=True)
+            for j in range(4)
+        ]
+        plugins[f"p{i}"] = SimpleNamespace(
+            name=f"p{i}", display_name="", version="1.0", author="", description="", enabled=True,
+            components=components, python_dependencies=[], dependencies=[], is_built_in=False,
+        )
+    registry = SimpleNamespace(_plugins=plugins)
+    manager = SimpleNamespace(loaded_plugins=dict.fromkeys(plugins), failed_plugins={}, plugin_paths={})
+
+    cached = PluginStatusPerception()
+    uncached = PluginStatusPerception()
+    uncached.STATUS_CACHE_TTL = -1.0
+    cached.STATUS_CACHE_TTL = 3600.0
+    for perception in (cached, uncached):
+        perception.plugin_manager = manager
+        perception.component_registry = registry
+
+    mismatches = 0
+    for _ in range(300):
+        plugin = rng.choice(list(plugins.values()))
+        op = rng.random()
+        if op < 0.4:
+            rng.choice(plugin.components).enabled ^= True
+        elif op < 0.6:
+            plugin.enabled = not plugin.enabled
+        elif op < 0.8:
+            if manager.failed_plugins.pop(plugin.name, None) is None:
+                manager.failed_plugins[plugin.name] = "error"
+
+        status = cached.get_plugin_system_status()
+        # 调用方修改返回结果不应影响缓存
+        status.all_plugins[0].component_types.clear()
+        status.enabled_plugin_names.append("篡改")
+
+        actual = cached.get_plugin_system_status().to_dict()
+        reference = uncached.get_plugin_system_status().to_dict()
+        actual.pop("timestamp")
+        reference.pop("timestamp")
+        if actual != reference:
+            mismatches += 1
+
+    assert mismatches == 0, "插件状态缓存结果与重新统计不一致"
+
+    print("\n✅ 插件状态缓存失效测试完成")
+
+
+async def test_event_window_parity():
+    """测试事件序列二分查询与逐条筛选的结果一致"""
+    from plugins.perception_plugin.core.event_sequence_perception import EventSequencePerception
+
+    print("\n" + "=" * 60)
+    print("测试 11: 事件序列二分查询")
+    print("=" * 60)
+
+    rng = random.Random(5)
+    perception = EventSequencePerception(auto_detect=False)
+    now = time.time()
+    for i in range(500):
+        # 含相同时间戳的事件，以及过去/将来各个时间段的事件
+        offset = rng.choice([0, 3600, 86400 * rng.randint(0, 60), 86400 * 3])
+        perception.add_event("chat", "custom", f"event_{i}", timestamp=now + rng.choice([-1, 1]) * offset)
+
+    events = perception.events["chat"]
+    mismatches = 0
+    for limit in (0, 1, 3, 10, 100):
+        expected = sorted(events, key=lambda e: e.timestamp, reverse=True)[:limit]
+        if [e.event_id for e in perception.get_recent_events("chat", limit)] != [e.event_id for e in expected]:
+            mismatches += 1
+
+        current = time.time()
+        upcoming = sorted((e for e in events if current < e.timestamp <= current + 30 * 86400), key=lambda e: e.timestamp)
+        actual = perception.get_upcoming_events("chat", 30, limit)
+        if [e.event_id for e in actual] != [e.event_id for e in upcoming[:limit]]:
+            mismatches += 1
+
+    status = perception.get_event_sequence_status("chat")
+    current = time.time()
+    if status.events_this_week != len([e for e in events if e.timestamp >= current - 7 * 86400]):
+        mismatches += 1
+    if status.events_this_month != len([e for e in events if e.timestamp >= current - 30 * 86400]):
+        mismatches += 1
+
+    assert mismatches == 0, "二分查询结果与逐条筛选不一致"
+
+    print("\n✅ 事件序列二分查询测试完成")
+
+
+async def test_active_hours_tie_order():
+    """测试活跃时段计数相同时的先后与逐条累加的结果一致（按首次出现的顺序）"""
+    from plugins.perception_plugin.core.behavior_pattern_perception import BehaviorPatternPerception, _hour_weekday
+
+    print("\n" + "=" * 60)
+    print("测试 12: 活跃时段并列顺序")
+    print("=" * 60)
+
+    rng = random.Random(6)
+    mismatches = 0
+    for _ in range(200):
+        perception = BehaviorPatternPerception()
+        # 少量消息、整小时间隔，使多个小时的计数相同
+        timestamp = time.time() - 3 * 86400
+        hourly_activity = {}
+        for _ in range(rng.randint(1, 30)):
+            timestamp += rng.choice([3600, 7200, 86400])
+            perception.record_message("user", "消息", "chat", timestamp)
+            hour = _hour_weekday(timestamp)[0]
+            hourly_activity[hour] = hourly_activity.get(hour, 0) + 1
+
+        pattern = perception.get_behavior_pattern("user")
+        by_count = sorted(hourly_activity.items(), key=lambda x: x[1], reverse=True)
+        least = sorted(hourly_activity.items(), key=lambda x: x[1])
+        if (
+            list(pattern.hourly_activity.items()) != list(hourly_activity.items())
+            or pattern.most_active_hours != [hour for hour, _ in by_count[:3]]
+            or pattern.least_active_hours != [hour for hour, _ in least[:3]]
+        ):
+            mismatches += 1
+
+    assert mismatches == 0, "活跃时段并列顺序与逐条累加不一致"
+
+    print("\n✅ 活跃时段并列顺序测试完成")
+
+
 async def run_benchmark():
     """运行完整的基准测试"""
     print("\n" + "=" * 60)
@@ -181,6 +548,15 @@ async def main():
         await test_cache_invalidation()
         await test_cpu_sampling()
         await test_tiered_cache()
+        await test_hour_weekday_parity()
+        await test_security_trigger_chars()
+        await test_language_stats_parity()
+        await test_security_recent_counter_parity()
+        await test_snapshot_cache_index()
+        await test_behavior_pattern_cache()
+        await test_plugin_status_cache()
+        await test_event_window_parity()
+        await test_active_hours_tie_order()
 
         # 运行基准测试
         await run_benchmark()